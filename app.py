@@ -1,30 +1,62 @@
-from flask import Flask, render_template, send_from_directory, abort, request, jsonify, send_file, session
+from flask import Flask, Request, Response, render_template, send_from_directory, abort, request, jsonify, send_file, session, url_for
 import os
 import logging
 import datetime
 from werkzeug.utils import secure_filename
-from pdf2docx import Converter
+from werkzeug.http import parse_options_header
+from werkzeug.wsgi import ClosingIterator
 import tempfile
-import fitz  # PyMuPDF
-from PIL import Image
 import io
 import zipfile
-from reportlab.pdfgen import canvas
+import shutil
+import itertools
+import math
 from reportlab.lib.pagesizes import A4, LETTER, LEGAL
-from docx import Document
 from reportlab.lib.units import inch
-from pptx import Presentation
-from openpyxl import load_workbook
-from reportlab.lib import colors
-import requests
-import pdfkit
-import PyPDF2
-import roman
 import jwt
 from functools import wraps
 import sqlite3
+import threading
+import time
+import uuid
+import cProfile
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import hmac
+import json
 from werkzeug.security import generate_password_hash, check_password_hash
-from pdf2image import convert_from_path
+from jobs import JobQueue
+from docx_convert import convert_pdf_to_docx
+from result_cache import ResultCache
+from pdf_render import get_render_pool, render_pdf_pages
+from pdf_pages import PdfPageWriter, ChunkedCanvas
+from pdf_update import incremental_update
+from table_render import TableRenderer
+from text_layout import TextLayout
+from html_render import RendererBusy, get_html_render_pool, wkhtmltopdf_args
+from upload import Upload
+from lazy_import import lazy_module, preload
+from metrics import MetricsRegistry
+from timing import span, timed, start_timing, current_timings, stop_timing
+
+def configure_reportlab(canvas_module):
+    # Keep image streams binary; ASCII85 only inflates them by a quarter
+    canvas_module.rl_config.useA85 = 0
+
+# Converter libraries, imported on first use so that a worker only loads
+# what its requests need
+canvas = lazy_module('reportlab.pdfgen.canvas', on_load=configure_reportlab)
+reportlab_utils = lazy_module('reportlab.lib.utils')
+Image = lazy_module('PIL.Image')
+docx = lazy_module('docx')
+pptx = lazy_module('pptx')
+openpyxl = lazy_module('openpyxl')
+requests = lazy_module('requests')
+PyPDF2 = lazy_module('PyPDF2')
+generic = lazy_module('PyPDF2.generic')
+roman = lazy_module('roman')
+url_fetch = lazy_module('url_fetch')
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -33,15 +65,173 @@ logger = logging.getLogger(__name__)
 # Get the absolute path of the current directory
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 
+# Where the user and job databases and the upload folder live. Tests and
+# benchmarks point this at a temporary directory, as importing app creates
+# them
+DATA_DIR = os.environ.get('DATA_DIR', BASE_DIR)
+
 app = Flask(__name__, static_url_path='', static_folder='.')
 app.secret_key = os.urandom(24)  # Generate a secure secret key
 JWT_SECRET_KEY = os.urandom(24)  # Generate a secure JWT secret key
 
 # Configure upload folder
-UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
+UPLOAD_FOLDER = os.path.join(DATA_DIR, 'uploads')
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
+# Upload settings: the largest request body accepted, the largest body for
+# /merge-pdf, which takes many files at once, and the largest file kept in
+# memory instead of being spilled to a temporary file
+MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 100 * 1024 * 1024))
+MERGE_MAX_CONTENT_LENGTH = int(os.environ.get('MERGE_MAX_CONTENT_LENGTH', 2 * 1024 * 1024 * 1024))
+UPLOAD_MEMORY_LIMIT = int(os.environ.get('UPLOAD_MEMORY_LIMIT', 4 * 1024 * 1024))
+
+# Background job settings
+JOB_FOLDER = os.path.join(UPLOAD_FOLDER, 'jobs')
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+JOB_RETENTION = int(os.environ.get('JOB_RETENTION', 24 * 3600))  # seconds
+
+# PDF to Word settings: default and maximum worker processes per request
+PDF_TO_WORD_WORKERS = int(os.environ.get('PDF_TO_WORD_WORKERS', 1))
+PDF_TO_WORD_MAX_WORKERS = int(os.environ.get('PDF_TO_WORD_MAX_WORKERS', os.cpu_count() or 1))
+
+# PDF to JPEG settings: default and maximum render workers per request, and
+# the size of the render process pool shared by all requests
+PDF_TO_JPEG_WORKERS = int(os.environ.get('PDF_TO_JPEG_WORKERS', 1))
+PDF_TO_JPEG_POOL_SIZE = int(os.environ.get('PDF_TO_JPEG_POOL_SIZE', os.cpu_count() or 1))
+PDF_TO_JPEG_MAX_WORKERS = int(os.environ.get('PDF_TO_JPEG_MAX_WORKERS', max(1, PDF_TO_JPEG_POOL_SIZE // 2)))
+
+# JPG to PDF settings: default and maximum preprocessing threads per request
+JPG_TO_PDF_WORKERS = int(os.environ.get('JPG_TO_PDF_WORKERS', 4))
+JPG_TO_PDF_MAX_WORKERS = int(os.environ.get('JPG_TO_PDF_MAX_WORKERS', os.cpu_count() or 1))
+
+# Excel to PDF settings: rows sampled per sheet to size its columns, the
+# widest a column is drawn, and the pages drawn on one canvas before it is
+# written out, which bounds the memory a long sheet takes
+EXCEL_WIDTH_SAMPLE_ROWS = int(os.environ.get('EXCEL_WIDTH_SAMPLE_ROWS', 1000))
+EXCEL_MAX_COLUMN_WIDTH = 100
+EXCEL_PAGES_PER_CHUNK = int(os.environ.get('EXCEL_PAGES_PER_CHUNK', 100))
+
+# HTML to PDF settings: the wkhtmltopdf binary, how many renderer processes
+# are kept warm, how long a request waits for one, and when one is replaced
+WKHTMLTOPDF_PATH = os.environ.get('WKHTMLTOPDF_PATH') or shutil.which('wkhtmltopdf') or 'wkhtmltopdf'
+HTML_RENDER_WORKERS = int(os.environ.get('HTML_RENDER_WORKERS', 2))
+HTML_RENDER_QUEUE_TIMEOUT = int(os.environ.get('HTML_RENDER_QUEUE_TIMEOUT', 30))  # seconds
+HTML_RENDER_TIMEOUT = int(os.environ.get('HTML_RENDER_TIMEOUT', 60))  # seconds
+HTML_RENDER_MAX_JOBS = int(os.environ.get('HTML_RENDER_MAX_JOBS', 100))
+HTML_RENDER_MAX_RSS = int(os.environ.get('HTML_RENDER_MAX_RSS', 512 * 1024 * 1024))
+
+# Conversion result cache settings; a size of 0 disables the cache
+RESULT_CACHE_FOLDER = os.path.join(UPLOAD_FOLDER, 'cache')
+RESULT_CACHE_MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+# Form fields that change how a result is produced but not the result itself
+RESULT_CACHE_IGNORED_FIELDS = {'workers'}
+
+result_cache = ResultCache(RESULT_CACHE_FOLDER, RESULT_CACHE_MAX_BYTES)
+
+# URL to PDF settings: connect and read timeouts, the largest page or asset
+# fetched, how many assets a page may pull in, and the shared asset cache
+URL_FETCH_CONNECT_TIMEOUT = float(os.environ.get('URL_FETCH_CONNECT_TIMEOUT', 5))  # seconds
+URL_FETCH_READ_TIMEOUT = float(os.environ.get('URL_FETCH_READ_TIMEOUT', 20))  # seconds
+URL_FETCH_MAX_BYTES = int(os.environ.get('URL_FETCH_MAX_BYTES', 10 * 1024 * 1024))
+URL_FETCH_MAX_ASSETS = int(os.environ.get('URL_FETCH_MAX_ASSETS', 100))
+URL_FETCH_POOL_SIZE = int(os.environ.get('URL_FETCH_POOL_SIZE', 16))
+ASSET_CACHE_FOLDER = os.path.join(UPLOAD_FOLDER, 'assets')
+ASSET_CACHE_MAX_BYTES = int(os.environ.get('ASSET_CACHE_MAX_BYTES', 128 * 1024 * 1024))
+ASSET_CACHE_TTL = int(os.environ.get('ASSET_CACHE_TTL', 3600))  # seconds
+
+_page_fetcher = None
+_page_fetcher_lock = threading.Lock()
+
+def get_page_fetcher():
+    """Return the shared page fetcher, creating it on first use."""
+    global _page_fetcher
+    with _page_fetcher_lock:
+        if _page_fetcher is None:
+            _page_fetcher = url_fetch.PageFetcher(
+                url_fetch.get_session(URL_FETCH_POOL_SIZE),
+                ResultCache(ASSET_CACHE_FOLDER, ASSET_CACHE_MAX_BYTES),
+                timeout=(URL_FETCH_CONNECT_TIMEOUT, URL_FETCH_READ_TIMEOUT),
+                max_bytes=URL_FETCH_MAX_BYTES,
+                max_assets=URL_FETCH_MAX_ASSETS,
+                asset_ttl=ASSET_CACHE_TTL
+            )
+        return _page_fetcher
+
+# Converter libraries to import at startup instead of on first use: a
+# comma-separated list of module names, or "all". Useful where workers are
+# forked from a preloaded process and can share the parent's copy.
+PRELOAD_MODULES = os.environ.get('PRELOAD_MODULES', '')
+if PRELOAD_MODULES:
+    preload(None if PRELOAD_MODULES == 'all' else [name.strip() for name in PRELOAD_MODULES.split(',')])
+
+# Metrics served at /metrics in the Prometheus text format. If a token is
+# set, scrapers must send it as "Authorization: Bearer <token>".
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+metrics = MetricsRegistry()
+requests_total = metrics.counter('pdf_requests_total', 'Requests handled, by route, method and status.', ('route', 'method', 'status'))
+request_duration = metrics.histogram('pdf_request_duration_seconds', 'Time from the start of a request until its response has been sent.', ('route',))
+request_bytes = metrics.counter('pdf_request_bytes_total', 'Request body bytes received.', ('route',))
+response_bytes = metrics.counter('pdf_response_bytes_total', 'Response body bytes sent.', ('route',))
+pages_processed = metrics.counter('pdf_pages_processed_total', 'Pages read, written or rendered by conversions.', ('route',))
+conversions_in_progress = metrics.gauge('pdf_conversions_in_progress', 'Conversions started whose response has not been sent yet.', ('route',))
+
+def metrics_route():
+    """Return the route label of the current request: its URL rule, not its path."""
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+def record_pages(count, route=None):
+    pages_processed.inc(route or metrics_route(), amount=count)
+
+def directory_size(path, prefix=''):
+    """Return the bytes used by the files under ``path`` whose top-level name starts with ``prefix``."""
+    total = 0
+    try:
+        entries = [entry for entry in os.scandir(path) if entry.name.startswith(prefix)]
+    except OSError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                total += directory_size(entry.path)
+            else:
+                total += entry.stat(follow_symlinks=False).st_size
+        except OSError:
+            pass  # removed while scanning
+    return total
+
+def temp_disk_usage():
+    # Measured when scraped, so recording requests costs nothing. The temp
+    # directory is shared: this counts every process's tempfile files there.
+    usage = {
+        ('temp',): directory_size(tempfile.gettempdir(), prefix=tempfile.gettempprefix()),
+        ('result_cache',): result_cache.total_bytes,
+        ('jobs',): directory_size(JOB_FOLDER),
+    }
+    if _page_fetcher is not None:
+        usage[('asset_cache',)] = _page_fetcher.asset_cache.total_bytes
+    return usage
+
+def result_cache_lookups():
+    stats = result_cache.stats()
+    return {('hit',): stats['hits'], ('miss',): stats['misses']}
+
+metrics.callback('pdf_temp_disk_bytes', 'Disk used by temporary files and on-disk caches.', ('directory',), temp_disk_usage)
+metrics.callback('pdf_result_cache_lookups_total', 'Result cache lookups, by result.', ('result',), result_cache_lookups, kind='counter')
+
+# Request profiling, off by default. A request is profiled with cProfile if
+# it sends "X-Profile-Token: <PROFILE_TOKEN>", or if its URL rule is listed
+# in PROFILE_ROUTES (comma-separated, e.g. "/convert-pdf-to-word"). One
+# request is profiled at a time; the newest PROFILE_MAX_FILES profiles are
+# kept in PROFILE_FOLDER and can be read with pstats or snakeviz.
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PROFILE_ROUTES = {route.strip() for route in os.environ.get('PROFILE_ROUTES', '').split(',') if route.strip()}
+PROFILE_FOLDER = os.path.join(UPLOAD_FOLDER, 'profiles')
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', 50))
+
+_profile_lock = threading.Lock()
+
 # Define page sizes
 PAGE_SIZES = {
     'a4': A4,
@@ -49,17 +239,70 @@ PAGE_SIZES = {
     'legal': LEGAL
 }
 
-# Set poppler path - update this path according to your installation
-POPPLER_PATH = r'C:\Program Files\poppler\Library\bin'
-if os.path.exists(POPPLER_PATH):
-    os.environ['PATH'] = POPPLER_PATH + os.pathsep + os.environ['PATH']
-    logger.info(f'Poppler path added to PATH: {POPPLER_PATH}')
-else:
-    logger.warning('Poppler path not found. PDF to image conversion may not work.')
+# User database settings
+DATABASE_PATH = os.path.join(DATA_DIR, 'users.db')
+_db_local = threading.local()
+
+def get_db():
+    """Return this thread's connection to the user database.
+
+    Connections are opened once per thread, and again after a fork or a
+    change of DATABASE_PATH, then reused. sqlite3 keeps compiled statements
+    per connection keyed by their SQL text, so the fixed queries below are
+    only prepared once.
+    """
+    conn = getattr(_db_local, 'conn', None)
+    if conn is None or _db_local.owner != (os.getpid(), DATABASE_PATH):
+        # A connection inherited across fork belongs to the parent; just drop it
+        if conn is not None and _db_local.owner[0] == os.getpid():
+            conn.close()
+        conn = sqlite3.connect(DATABASE_PATH, timeout=30, cached_statements=64)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute('PRAGMA cache_size=-8000')  # 8 MB
+        _db_local.conn = conn
+        _db_local.owner = (os.getpid(), DATABASE_PATH)
+    return conn
+
+# Authenticated identity cache settings
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 10000))
+TOKEN_CACHE_TTL = int(os.environ.get('TOKEN_CACHE_TTL', 300))  # seconds
+_token_cache = OrderedDict()  # token -> (expires_at, user), least recently used first
+_token_cache_lock = threading.Lock()
+
+def get_cached_user(token):
+    """Return the cached user for a token, or None if missing or expired."""
+    with _token_cache_lock:
+        entry = _token_cache.get(token)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at <= time.time():
+            del _token_cache[token]
+            return None
+        _token_cache.move_to_end(token)
+        return dict(user)
+
+def cache_user(token, user, token_expiry):
+    """Remember the user for a token, never beyond the token's own expiry."""
+    expires_at = min(time.time() + TOKEN_CACHE_TTL, token_expiry)
+    with _token_cache_lock:
+        _token_cache[token] = (expires_at, dict(user))
+        _token_cache.move_to_end(token)
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+
+def invalidate_user_tokens(user_id):
+    """Drop every cached token entry for a user after their record changes."""
+    with _token_cache_lock:
+        stale = [token for token, (_, user) in _token_cache.items() if user['id'] == user_id]
+        for token in stale:
+            del _token_cache[token]
 
 # Database initialization
 def init_db():
-    conn = sqlite3.connect('users.db')
+    conn = get_db()
     c = conn.cursor()
     c.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -72,7 +315,6 @@ def init_db():
         )
     ''')
     conn.commit()
-    conn.close()
 
 # Initialize database
 init_db()
@@ -90,23 +332,75 @@ def token_required(f):
         if not token:
             return jsonify({'message': 'Token is missing'}), 401
         
-        try:
-            # Verify token
-            data = jwt.decode(token, JWT_SECRET_KEY, algorithms=["HS256"])
-            current_user = get_user_by_id(data['user_id'])
-        except:
-            return jsonify({'message': 'Token is invalid'}), 401
+        # Repeat calls with the same token skip decoding and the database
+        current_user = get_cached_user(token)
+        if current_user is None:
+            try:
+                # Verify token
+                data = jwt.decode(token, JWT_SECRET_KEY, algorithms=["HS256"])
+                current_user = get_user_by_id(data['user_id'])
+            except:
+                return jsonify({'message': 'Token is invalid'}), 401
+
+            if current_user:
+                cache_user(token, current_user, data['exp'])
         
         return f(current_user, *args, **kwargs)
     return decorated
 
+def conversion_cache_key():
+    """Hash the route, normalized form fields and uploaded files of a request."""
+    digest = hashlib.sha256(request.path.encode())
+
+    for key in sorted(request.form):
+        if key in RESULT_CACHE_IGNORED_FIELDS:
+            continue
+        for value in request.form.getlist(key):
+            digest.update(b'\0' + key.encode() + b'=' + value.strip().encode())
+
+    for field in sorted(request.files):
+        for file in request.files.getlist(field):
+            # The file name is part of the key because routes derive the download name from it
+            digest.update(b'\0' + field.encode() + b':' + (file.filename or '').encode() + b'\0')
+            for chunk in iter(lambda: file.stream.read(1024 * 1024), b''):
+                digest.update(chunk)
+            file.stream.seek(0)
+
+    return digest.hexdigest()
+
+# Conversion result cache decorator
+def cached_conversion(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        # Pages fetched from a URL can change between requests
+        if RESULT_CACHE_MAX_BYTES <= 0 or 'url' in request.form:
+            return f(*args, **kwargs)
+
+        key = conversion_cache_key()
+        cached = result_cache.get(key)
+        if cached:
+            path, meta = cached
+            response = send_file(path, mimetype=meta['mimetype'])
+            response.headers.update(meta['headers'])
+            response.headers['X-Cache'] = 'HIT'
+            return response
+
+        response = app.make_response(f(*args, **kwargs))
+        if response.status_code == 200:
+            # Store the body as it is sent so streamed responses stay streamed
+            meta = {'mimetype': response.mimetype, 'headers': {}}
+            if 'Content-Disposition' in response.headers:
+                meta['headers']['Content-Disposition'] = response.headers['Content-Disposition']
+            response.response = result_cache.tee(key, response.response, meta)
+            response.direct_passthrough = False
+        response.headers['X-Cache'] = 'MISS'
+        return response
+    return decorated
+
 # User management functions
 def get_user_by_id(user_id):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT id, first_name, last_name, email FROM users WHERE id = ?', (user_id,))
+    c = get_db().execute('SELECT id, first_name, last_name, email FROM users WHERE id = ?', (user_id,))
     user = c.fetchone()
-    conn.close()
     
     if user:
         return {
@@ -118,12 +412,13 @@ def get_user_by_id(user_id):
     return None
 
 def get_user_by_email(email):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM users WHERE email = ?', (email,))
-    user = c.fetchone()
-    conn.close()
-    return user
+    c = get_db().execute('SELECT * FROM users WHERE email = ?', (email,))
+    return c.fetchone()
+
+def get_password_hash(user_id):
+    c = get_db().execute('SELECT password FROM users WHERE id = ?', (user_id,))
+    row = c.fetchone()
+    return row[0] if row else None
 
 # Authentication routes
 @app.route('/api/register', methods=['POST'])
@@ -138,23 +433,18 @@ def register():
                 return jsonify({'error': f'{field} is required'}), 400
         
         # Check if user already exists
-        conn = sqlite3.connect('users.db')
-        c = conn.cursor()
-        c.execute('SELECT * FROM users WHERE email = ?', (data['email'],))
-        if c.fetchone():
-            conn.close()
+        if get_user_by_email(data['email']):
             return jsonify({'error': 'Email already registered'}), 400
         
         # Hash password
         hashed_password = generate_password_hash(data['password'])
         
         # Insert new user
-        c.execute('''
-            INSERT INTO users (first_name, last_name, email, password)
-            VALUES (?, ?, ?, ?)
-        ''', (data['first_name'], data['last_name'], data['email'], hashed_password))
-        conn.commit()
-        conn.close()
+        with get_db() as conn:
+            conn.execute('''
+                INSERT INTO users (first_name, last_name, email, password)
+                VALUES (?, ?, ?, ?)
+            ''', (data['first_name'], data['last_name'], data['email'], hashed_password))
         
         return jsonify({'message': 'Registration successful'}), 201
         
@@ -217,25 +507,22 @@ def update_profile(current_user):
             return jsonify({'message': 'Email already registered'}), 400
     
     # Update user profile
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
     try:
-        c.execute('''
-            UPDATE users 
-            SET first_name = ?, last_name = ?, email = ?
-            WHERE id = ?
-        ''', (
-            data.get('first_name', current_user['first_name']),
-            data.get('last_name', current_user['last_name']),
-            data.get('email', current_user['email']),
-            current_user['id']
-        ))
-        conn.commit()
+        with get_db() as conn:
+            conn.execute('''
+                UPDATE users 
+                SET first_name = ?, last_name = ?, email = ?
+                WHERE id = ?
+            ''', (
+                data.get('first_name', current_user['first_name']),
+                data.get('last_name', current_user['last_name']),
+                data.get('email', current_user['email']),
+                current_user['id']
+            ))
+        invalidate_user_tokens(current_user['id'])
         return jsonify({'message': 'Profile updated successfully'})
     except Exception as e:
         return jsonify({'message': 'Profile update failed'}), 500
-    finally:
-        conn.close()
 
 @app.route('/api/user/password', methods=['PUT'])
 @token_required
@@ -246,33 +533,139 @@ def change_password(current_user):
         return jsonify({'message': 'Current and new passwords are required'}), 400
     
     # Verify current password
-    user = get_user_by_id(current_user['id'])
-    if not check_password_hash(user[4], data['current_password']):
+    password_hash = get_password_hash(current_user['id'])
+    if not password_hash or not check_password_hash(password_hash, data['current_password']):
         return jsonify({'message': 'Current password is incorrect'}), 401
     
     # Update password
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
     try:
-        c.execute('''
-            UPDATE users 
-            SET password = ?
-            WHERE id = ?
-        ''', (generate_password_hash(data['new_password']), current_user['id']))
-        conn.commit()
+        with get_db() as conn:
+            conn.execute('''
+                UPDATE users 
+                SET password = ?
+                WHERE id = ?
+            ''', (generate_password_hash(data['new_password']), current_user['id']))
+        invalidate_user_tokens(current_user['id'])
         return jsonify({'message': 'Password updated successfully'})
     except Exception as e:
         return jsonify({'message': 'Password update failed'}), 500
-    finally:
-        conn.close()
 
 @app.after_request
 def after_request(response):
     response.headers.add('Access-Control-Allow-Origin', '*')
     response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
-    response.headers.add('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+    response.headers.add('Access-Control-Allow-Methods', 'GET, POST, DELETE, OPTIONS')
     return response
 
+@app.before_request
+def start_request_metrics():
+    request.metrics_start = time.perf_counter()
+    request.metrics_conversion = request.endpoint is not None and request.path.strip('/') in JOB_OPERATIONS
+    if request.metrics_conversion:
+        conversions_in_progress.inc(metrics_route())
+
+@app.after_request
+def record_request_metrics(response):
+    route = metrics_route()
+    start = getattr(request, 'metrics_start', None)
+    conversion = getattr(request, 'metrics_conversion', False)
+    requests_total.inc(route, request.method, str(response.status_code))
+    request_bytes.inc(route, amount=request.content_length or 0)
+
+    if response.content_length is not None:
+        response_bytes.inc(route, amount=response.content_length)
+    else:
+        response.response = count_response_bytes(response.response, route)
+
+    # Streamed responses are still being produced here; they finish on close
+    def finish():
+        if start is not None:
+            request_duration.observe(time.perf_counter() - start, route)
+        if conversion:
+            conversions_in_progress.dec(route)
+    call_on_close(response, finish)
+    return response
+
+def call_on_close(response, callback):
+    """Run ``callback`` once the response has been sent.
+
+    werkzeug skips ``Response.call_on_close`` callbacks for direct
+    passthrough bodies, such as send_file's, so those are wrapped instead.
+    """
+    if response.direct_passthrough:
+        response.response = ClosingIterator(response.response, callback)
+    else:
+        response.call_on_close(callback)
+
+def count_response_bytes(chunks, route):
+    sent = 0
+    try:
+        for chunk in chunks:
+            sent += len(chunk)
+            yield chunk
+    finally:
+        response_bytes.inc(route, amount=sent)
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+@app.before_request
+def start_request_timing():
+    start_timing()
+    if profile_requested():
+        # cProfile allows one active profiler; concurrent requests go unprofiled
+        if _profile_lock.acquire(blocking=False):
+            request.profiler = cProfile.Profile()
+            request.profiler.enable()
+
+def profile_requested():
+    token = request.headers.get('X-Profile-Token')
+    if token and PROFILE_TOKEN and hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode()):
+        return True
+    return metrics_route() in PROFILE_ROUTES
+
+@app.after_request
+def record_request_timing(response):
+    timings = current_timings()
+    if timings is None:
+        return response
+
+    # Stages that run while a response streams are only in the log line
+    response.headers['Server-Timing'] = timings.server_timing()
+    profiler = getattr(request, 'profiler', None)
+    if profiler is not None:
+        profile_name = f'{time.strftime("%Y%m%d-%H%M%S")}-{request.endpoint or "unmatched"}-{uuid.uuid4().hex[:8]}.prof'
+        response.headers['X-Profile'] = profile_name
+
+    fields = {'method': request.method, 'route': metrics_route(), 'status': response.status_code}
+    sent_at = time.perf_counter()
+
+    def finish():
+        timings.add('send', time.perf_counter() - sent_at)
+        if profiler is not None:
+            save_profile(profiler, profile_name)
+        fields.update(timings.log_fields())
+        logger.info('Request timings ' + ' '.join(f'{key}={value}' for key, value in fields.items()),
+                    extra={'timings': fields})
+        stop_timing()
+    call_on_close(response, finish)
+    return response
+
+def save_profile(profiler, name):
+    """Write a request's profile and drop the oldest ones over PROFILE_MAX_FILES."""
+    try:
+        profiler.disable()
+        os.makedirs(PROFILE_FOLDER, exist_ok=True)
+        profiler.dump_stats(os.path.join(PROFILE_FOLDER, name))
+        # Names start with a timestamp, so they sort oldest first
+        profiles = sorted(entry for entry in os.listdir(PROFILE_FOLDER) if entry.endswith('.prof'))
+        for old in profiles[:max(0, len(profiles) - PROFILE_MAX_FILES)]:
+            os.unlink(os.path.join(PROFILE_FOLDER, old))
+        logger.info(f'Saved request profile {name}')
+    except OSError as e:
+        logger.error(f'Error saving request profile: {str(e)}')
+    finally:
+        _profile_lock.release()
+
 @app.route('/')
 def index():
     try:
@@ -292,6 +685,7 @@ def register_page():
         abort(500)
 
 @app.route('/convert-jpg-to-pdf', methods=['POST'])
+@cached_conversion
 def convert_jpg_to_pdf():
     try:
         logger.info('Starting JPG to PDF conversion')
@@ -308,6 +702,12 @@ def convert_jpg_to_pdf():
         # Get settings
         page_size = request.form.get('page_size', 'a4')
         orientation = request.form.get('orientation', 'auto')
+        target_dpi = request.form.get('target_dpi')
+        target_dpi = int(target_dpi) if target_dpi else None
+
+        # Number of images prepared in parallel, capped by the server configuration
+        workers = int(request.form.get('workers', JPG_TO_PDF_WORKERS))
+        workers = max(1, min(workers, JPG_TO_PDF_MAX_WORKERS))
         
         logger.info(f'Processing {len(files)} images with page size: {page_size}, orientation: {orientation}')
 
@@ -319,59 +719,30 @@ def convert_jpg_to_pdf():
                 # Create PDF
                 c = canvas.Canvas(pdf_temp.name, pagesize=PAGE_SIZES.get(page_size, A4))
                 
-                # Process each image
-                for file in files:
-                    if not file.filename.lower().endswith(('.jpg', '.jpeg')):
-                        continue
-                    
-                    # Open and process image
-                    img = Image.open(file.stream)
-                    
-                    # Determine page size and orientation
-                    page_width, page_height = PAGE_SIZES.get(page_size, A4)
-                    
-                    if page_size == 'fit':
-                        # Use image dimensions
-                        page_width, page_height = img.size
-                        c.setPageSize((page_width, page_height))
-                    elif orientation == 'auto':
-                        # Auto-detect orientation based on image dimensions
-                        if (img.width > img.height) != (page_width > page_height):
-                            page_width, page_height = page_height, page_width
-                            c.setPageSize((page_width, page_height))
-                    elif orientation == 'landscape' and page_width < page_height:
-                        # Force landscape
-                        page_width, page_height = page_height, page_width
-                        c.setPageSize((page_width, page_height))
-                    elif orientation == 'portrait' and page_width > page_height:
-                        # Force portrait
-                        page_width, page_height = page_height, page_width
-                        c.setPageSize((page_width, page_height))
-                    
-                    # Calculate scaling to fit page while maintaining aspect ratio
-                    scale_width = page_width / img.width
-                    scale_height = page_height / img.height
-                    scale = min(scale_width, scale_height)
-                    
-                    # Calculate centered position
-                    width = img.width * scale
-                    height = img.height * scale
-                    x = (page_width - width) / 2
-                    y = (page_height - height) / 2
-                    
-                    # Save image to temporary file
-                    img_temp = tempfile.NamedTemporaryFile(suffix='.jpg', delete=False)
-                    img.save(img_temp.name, 'JPEG')
-                    
-                    # Draw image on PDF
-                    c.drawImage(img_temp.name, x, y, width=width, height=height)
-                    c.showPage()
-                    
-                    # Clean up temporary image file
-                    os.unlink(img_temp.name)
-                    logger.info(f'Processed image: {file.filename}')
+                image_files = [file for file in files if file.filename.lower().endswith(('.jpg', '.jpeg'))]
                 
-                c.save()
+                # Images are prepared in a thread pool but drawn in upload order
+                with span('draw'), ThreadPoolExecutor(max_workers=workers) as executor:
+                    prepared = iter_in_order(
+                        executor,
+                        lambda file: prepare_jpg_page(file, page_size, orientation, target_dpi),
+                        image_files,
+                        window=workers
+                    )
+                    for file, (page_dimensions, box, orientation_tag, image) in zip(image_files, prepared):
+                        c.setPageSize(page_dimensions)
+                        
+                        # Draw image on PDF, undoing the EXIF orientation with the CTM
+                        c.saveState()
+                        c.transform(*exif_orientation_matrix(orientation_tag, *box))
+                        c.drawImage(image, 0, 0, width=1, height=1)
+                        c.restoreState()
+                        c.showPage()
+                        logger.info(f'Processed image: {file.filename}')
+                
+                with span('write'):
+                    c.save()
+                record_pages(len(image_files))
                 logger.info('PDF creation completed successfully')
 
                 # Send the PDF file
@@ -401,7 +772,146 @@ def convert_jpg_to_pdf():
             'details': error_msg
         }), 500
 
+def fit_image_on_page(image_width, image_height, page_size, orientation):
+    """Return the page size and centred ``(x, y, width, height)`` box for an image."""
+    page_width, page_height = PAGE_SIZES.get(page_size, A4)
+    
+    if page_size == 'fit':
+        # Use image dimensions
+        page_width, page_height = image_width, image_height
+    elif orientation == 'auto':
+        # Auto-detect orientation based on image dimensions
+        if (image_width > image_height) != (page_width > page_height):
+            page_width, page_height = page_height, page_width
+    elif orientation == 'landscape' and page_width < page_height:
+        # Force landscape
+        page_width, page_height = page_height, page_width
+    elif orientation == 'portrait' and page_width > page_height:
+        # Force portrait
+        page_width, page_height = page_height, page_width
+    
+    # Calculate scaling to fit page while maintaining aspect ratio
+    scale = min(page_width / image_width, page_height / image_height)
+    
+    # Calculate centered position
+    width = image_width * scale
+    height = image_height * scale
+    x = (page_width - width) / 2
+    y = (page_height - height) / 2
+    return (page_width, page_height), (x, y, width, height)
+
+def downscale_jpeg(img, max_size, quality=90):
+    """Decode a JPEG at reduced size and re-encode it to fit within ``max_size``.
+
+    ``draft`` lets libjpeg scale by 1/2, 1/4 or 1/8 while decoding, so a
+    48 MP photo is never expanded to full resolution in memory.
+    """
+    img.draft(img.mode, max_size)
+    if img.mode not in ('L', 'RGB'):
+        img = img.convert('RGB')
+    img.thumbnail(max_size, Image.Resampling.LANCZOS)
+
+    output = io.BytesIO()
+    img.save(output, 'JPEG', quality=quality)
+    return output.getvalue()
+
+def prepare_jpg_page(file, page_size, orientation, target_dpi=None):
+    """Read one uploaded image and work out its page, placement and image data.
+
+    Returns ``(page_size, box, orientation_tag, image)``. JPEGs are passed
+    through untouched unless ``target_dpi`` is set and the photo has more
+    pixels than the page needs, in which case it is downscaled.
+    """
+    # Only the header is parsed here; pixel data is not decoded
+    image_data = file.read()
+    img = Image.open(io.BytesIO(image_data))
+    orientation_tag = exif_orientation(img)
+    rotated = orientation_tag in (5, 6, 7, 8)
+
+    image_width, image_height = img.size
+    if rotated:
+        # Displayed rotated by 90 degrees
+        image_width, image_height = image_height, image_width
+    page_dimensions, box = fit_image_on_page(image_width, image_height, page_size, orientation)
+
+    # Re-encode anything that is not a plain 8-bit JPEG
+    if img.format != 'JPEG' or img.mode not in ('L', 'RGB', 'CMYK'):
+        return page_dimensions, box, orientation_tag, reportlab_utils.ImageReader(img)
+
+    if target_dpi:
+        # Pixels needed to fill the box at the target DPI, in stored orientation
+        max_size = (math.ceil(box[2] * target_dpi / 72), math.ceil(box[3] * target_dpi / 72))
+        if rotated:
+            max_size = max_size[::-1]
+        if img.width > max_size[0] or img.height > max_size[1]:
+            image_data = downscale_jpeg(img, max_size)
+
+    return page_dimensions, box, orientation_tag, JpegPassthrough(image_data)
+
+def iter_in_order(executor, fn, items, window):
+    """Map ``fn`` over ``items`` in an executor, yielding results in order.
+
+    At most ``window`` items are submitted ahead of the consumer, which
+    bounds how many results are held in memory at once.
+    """
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+class JpegPassthrough:
+    """JPEG data that reportlab embeds unchanged as a DCTDecode stream.
+
+    ``Canvas.drawImage`` decodes ImageReader objects to fingerprint them, but
+    any other object with a ``jpeg_fh`` method is copied through byte for
+    byte and identified by ``str()``.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.digest = hashlib.sha1(data).hexdigest()
+
+    def jpeg_fh(self):
+        return io.BytesIO(self.data)
+
+    def __str__(self):
+        return f'jpeg:{self.digest}'
+
+def exif_orientation(img):
+    """Return the EXIF orientation tag of an image, defaulting to 1."""
+    try:
+        orientation = img.getexif().get(0x0112, 1)
+    except Exception:
+        return 1
+    return orientation if orientation in range(1, 9) else 1
+
+def exif_orientation_matrix(orientation, x, y, width, height):
+    """Return the transform that draws the unit square upright in a box.
+
+    ``width`` and ``height`` are the displayed (already rotated) size; the
+    matrix maps the stored image, drawn at (0, 0) with size 1 x 1, into the
+    box at ``(x, y)`` the way a viewer applying the EXIF tag would show it.
+    """
+    return {
+        1: (width, 0, 0, height, x, y),
+        2: (-width, 0, 0, height, x + width, y),  # mirrored horizontally
+        3: (-width, 0, 0, -height, x + width, y + height),  # rotated 180
+        4: (width, 0, 0, -height, x, y + height),  # mirrored vertically
+        5: (0, -height, -width, 0, x + width, y + height),  # transposed
+        6: (0, -height, width, 0, x, y + height),  # rotated 90 clockwise
+        7: (0, height, width, 0, x, y),  # transversed
+        8: (0, height, -width, 0, x + width, y),  # rotated 90 counter-clockwise
+    }[orientation]
+
 @app.route('/convert-pdf-to-jpeg', methods=['POST'])
+@cached_conversion
 def convert_pdf_to_jpeg():
     try:
         if 'file' not in request.files:
@@ -418,42 +928,103 @@ def convert_pdf_to_jpeg():
         if end_page:
             end_page = int(end_page)
 
-        # Create a temporary directory for processing
-        with tempfile.TemporaryDirectory() as temp_dir:
-            pdf_path = os.path.join(temp_dir, secure_filename(file.filename))
-            file.save(pdf_path)
+        # Number of pages rendered in parallel, capped per request
+        workers = int(request.form.get('workers', PDF_TO_JPEG_WORKERS))
+        workers = max(1, min(workers, PDF_TO_JPEG_MAX_WORKERS, PDF_TO_JPEG_POOL_SIZE))
+        executor = get_render_pool(PDF_TO_JPEG_POOL_SIZE) if workers > 1 else None
+
+        # The upload lives until the response has been streamed
+        upload = Upload(file, UPLOAD_MEMORY_LIMIT, suffix='.pdf')
+        try:
+            # Render workers open the PDF by path; a serial render reads the buffer
+            pdf = upload.path() if executor else upload.source()
 
-            # Convert PDF to images using pdf2image
+            # Render the first page up front so conversion errors still get a JSON response
+            pages = render_pdf_pages(
+                pdf, quality, start_page, end_page,
+                executor=executor, workers=workers
+            )
             try:
-                images = convert_from_path(
-                    pdf_path,
-                    dpi=quality,
-                    first_page=start_page,
-                    last_page=end_page
-                )
+                with span('render'):
+                    first_page = next(pages, None)
             except Exception as e:
+                upload.close()
                 return jsonify({'error': f'PDF conversion failed: {str(e)}'}), 500
+        except Exception:
+            upload.close()
+            raise
 
-            # Create a ZIP file containing all converted images
-            zip_path = os.path.join(temp_dir, 'converted_images.zip')
-            with zipfile.ZipFile(zip_path, 'w') as zip_file:
-                for i, image in enumerate(images, start=start_page):
-                    image_path = os.path.join(temp_dir, f'page_{i}.jpg')
-                    image.save(image_path, 'JPEG', quality=95)
-                    zip_file.write(image_path, f'page_{i}.jpg')
-
-            return send_file(
-                zip_path,
-                mimetype='application/zip',
-                as_attachment=True,
-                download_name=f"{os.path.splitext(file.filename)[0]}_images.zip"
-            )
+        route = metrics_route()
+        rendered_count = 0
+
+        def entries():
+            nonlocal rendered_count
+            for page_number, image_data in itertools.chain([first_page] if first_page else [], timed('render', pages)):
+                rendered_count += 1
+                yield f'page_{page_number}.jpg', image_data
+
+        def generate():
+            # Each page is rendered, encoded and sent before the next one starts
+            try:
+                yield from stream_zip(entries())
+            except Exception as e:
+                logger.error(f'Error streaming PDF to JPEG archive: {str(e)}')
+                raise
+
+        def release():
+            record_pages(rendered_count, route)
+            pages.close()
+            upload.close()
+
+        download_name = f"{secure_filename(os.path.splitext(file.filename)[0]) or 'converted'}_images.zip"
+        response = Response(generate(), mimetype='application/zip')
+        response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+        # Runs even if the client goes away before the body is started
+        call_on_close(response, release)
+        return response
 
     except Exception as e:
         app.logger.error(f"Error in PDF to JPEG conversion: {str(e)}")
         return jsonify({'error': 'An error occurred during conversion'}), 500
 
+class ZipStreamBuffer(io.RawIOBase):
+    """Write-only sink that lets zipfile build an archive incrementally.
+
+    It is not seekable, so zipfile writes each entry in one forward pass
+    and the bytes written so far can be drained and sent to the client.
+    ``PdfPageWriter`` writes PDFs through it the same way.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def stream_zip(entries):
+    """Yield a ZIP archive chunk by chunk from ``(name, data)`` pairs.
+
+    Entries are stored uncompressed: JPEG data does not shrink when deflated.
+    """
+    buffer = ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as zip_file:
+        for name, data in entries:
+            zip_file.writestr(name, data)
+            yield buffer.drain()
+    yield buffer.drain()
+
 @app.route('/convert-pdf-to-word', methods=['POST'])
+@cached_conversion
 def convert_pdf_to_word():
     try:
         logger.info('Starting PDF to Word conversion')
@@ -471,13 +1042,16 @@ def convert_pdf_to_word():
             logger.error(f'Invalid file type: {file.filename}')
             return jsonify({'error': 'Only PDF files are allowed'}), 400
 
+        # Number of worker processes, capped by the server configuration
+        workers = int(request.form.get('workers', PDF_TO_WORD_WORKERS))
+        workers = max(1, min(workers, PDF_TO_WORD_MAX_WORKERS))
+
         logger.info(f'Processing file: {file.filename}')
 
         # Create temporary files for processing
         try:
-            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as pdf_temp:
-                logger.info(f'Created temporary PDF file: {pdf_temp.name}')
-                file.save(pdf_temp.name)
+            with Upload(file, UPLOAD_MEMORY_LIMIT, suffix='.pdf') as upload:
+                logger.info(f'Received upload ({"in memory" if upload.in_memory else "spilled to disk"})')
                 
                 docx_temp = tempfile.NamedTemporaryFile(suffix='.docx', delete=False)
                 docx_temp.close()
@@ -485,10 +1059,8 @@ def convert_pdf_to_word():
 
                 try:
                     # Convert PDF to DOCX
-                    logger.info('Starting PDF to DOCX conversion')
-                    cv = Converter(pdf_temp.name)
-                    cv.convert(docx_temp.name)
-                    cv.close()
+                    logger.info(f'Starting PDF to DOCX conversion with {workers} worker(s)')
+                    record_pages(convert_pdf_to_docx(upload.source(), docx_temp.name, workers=workers))
                     logger.info('PDF to DOCX conversion completed successfully')
 
                     # Verify the output file exists and has content
@@ -513,7 +1085,6 @@ def convert_pdf_to_word():
                     # Clean up temporary files
                     logger.info('Cleaning up temporary files')
                     try:
-                        os.unlink(pdf_temp.name)
                         os.unlink(docx_temp.name)
                     except Exception as cleanup_error:
                         logger.error(f'Error cleaning up temporary files: {str(cleanup_error)}')
@@ -531,6 +1102,7 @@ def convert_pdf_to_word():
         }), 500
 
 @app.route('/convert-word-to-pdf', methods=['POST'])
+@cached_conversion
 def convert_word_to_pdf():
     try:
         if 'file' not in request.files:
@@ -543,32 +1115,30 @@ def convert_word_to_pdf():
         if not file.filename.lower().endswith(('.doc', '.docx')):
             return 'Invalid file format. Please upload a Word document (.doc or .docx)', 400
 
-        # Create temporary files for processing
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as temp_word:
-            file.save(temp_word.name)
+        # Small uploads are read straight from memory
+        with Upload(file, UPLOAD_MEMORY_LIMIT, suffix='.docx') as upload:
             
             # Create temporary file for PDF output
             with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_pdf:
                 try:
                     # Load the Word document
-                    doc = Document(temp_word.name)
+                    with span('parse'):
+                        doc = docx.Document(upload.open())
                     
                     # Create PDF
                     c = canvas.Canvas(temp_pdf.name, pagesize=LETTER)
                     width, height = LETTER
-                    y = height - inch  # Start from top of page
+                    layout = TextLayout(c, LETTER)
                     
-                    # Process each paragraph
-                    for para in doc.paragraphs:
-                        if y < inch:  # Check if we need a new page
-                            c.showPage()
-                            y = height - inch
+                    # Process each paragraph, wrapping it to the page width
+                    with span('layout'):
+                        for para in doc.paragraphs:
+                            layout.add_text(para.text)
                         
-                        # Add text to PDF
-                        c.drawString(inch, y, para.text)
-                        y -= 14  # Move down for next line
-                    
-                    c.save()
+                        layout.flush()
+                    with span('write'):
+                        c.save()
+                    record_pages(c.getPageNumber() - 1)
                     
                     # Return the PDF file
                     return send_file(
@@ -585,7 +1155,6 @@ def convert_word_to_pdf():
                 finally:
                     # Clean up temporary files
                     try:
-                        os.unlink(temp_word.name)
                         os.unlink(temp_pdf.name)
                     except Exception as e:
                         logging.error(f"Error cleaning up temporary files: {str(e)}")
@@ -595,6 +1164,7 @@ def convert_word_to_pdf():
         return f"Error processing file: {str(e)}", 500
 
 @app.route('/convert-powerpoint-to-pdf', methods=['POST'])
+@cached_conversion
 def convert_powerpoint_to_pdf():
     try:
         if 'file' not in request.files:
@@ -607,37 +1177,36 @@ def convert_powerpoint_to_pdf():
         if not file.filename.lower().endswith(('.ppt', '.pptx')):
             return 'Invalid file format. Please upload a PowerPoint presentation (.ppt or .pptx)', 400
 
-        # Create temporary files for processing
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pptx') as temp_ppt:
-            file.save(temp_ppt.name)
+        # Small uploads are read straight from memory
+        with Upload(file, UPLOAD_MEMORY_LIMIT, suffix='.pptx') as upload:
             
             # Create temporary file for PDF output
             with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_pdf:
                 try:
                     # Load the PowerPoint presentation
-                    prs = Presentation(temp_ppt.name)
+                    with span('parse'):
+                        prs = pptx.Presentation(upload.open())
                     
                     # Create PDF
                     c = canvas.Canvas(temp_pdf.name, pagesize=LETTER)
-                    width, height = letter
+                    layout = TextLayout(c, LETTER)
                     
                     # Process each slide
-                    for slide in prs.slides:
-                        # Start a new page for each slide
-                        y = height - inch
+                    with span('layout'):
+                        for slide in prs.slides:
+                            # Process shapes in the slide (text boxes, etc.)
+                            for shape in slide.shapes:
+                                if hasattr(shape, "text"):
+                                    # Draw text from the shape
+                                    text = shape.text.strip()
+                                    if text:
+                                        layout.add_text(text)
                         
-                        # Process shapes in the slide (text boxes, etc.)
-                        for shape in slide.shapes:
-                            if hasattr(shape, "text"):
-                                # Draw text from the shape
-                                text = shape.text.strip()
-                                if text:
-                                    c.drawString(inch, y, text)
-                                    y -= 14  # Move down for next line
-                        
-                        c.showPage()  # Move to next page
+                            layout.show_page()  # Start a new page for the next slide
                     
-                    c.save()
+                    with span('write'):
+                        c.save()
+                    record_pages(c.getPageNumber() - 1)
                     
                     # Return the PDF file
                     return send_file(
@@ -654,7 +1223,6 @@ def convert_powerpoint_to_pdf():
                 finally:
                     # Clean up temporary files
                     try:
-                        os.unlink(temp_ppt.name)
                         os.unlink(temp_pdf.name)
                     except Exception as e:
                         logging.error(f"Error cleaning up temporary files: {str(e)}")
@@ -664,6 +1232,7 @@ def convert_powerpoint_to_pdf():
         return f"Error processing file: {str(e)}", 500
 
 @app.route('/convert-excel-to-pdf', methods=['POST'])
+@cached_conversion
 def convert_excel_to_pdf():
     try:
         if 'file' not in request.files:
@@ -681,75 +1250,72 @@ def convert_excel_to_pdf():
         include_gridlines = request.form.get('includeGridlines', 'true').lower() == 'true'
         all_worksheets = request.form.get('allWorksheets', 'true').lower() == 'true'
 
-        # Create temporary files for processing
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as temp_excel:
-            file.save(temp_excel.name)
+        # Small uploads are read straight from memory
+        with Upload(file, UPLOAD_MEMORY_LIMIT, suffix='.xlsx') as upload:
             
             # Create temporary file for PDF output
             with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_pdf:
                 try:
-                    # Load the Excel workbook
-                    wb = load_workbook(temp_excel.name)
+                    # Stream the workbook; read-only mode never holds a whole sheet in memory
+                    with span('parse'):
+                        wb = openpyxl.load_workbook(upload.open(), read_only=True)
                     
-                    # Create PDF
-                    c = canvas.Canvas(temp_pdf.name, pagesize=letter)
-                    width, height = letter
+                    # Create PDF, a chunk of pages at a time
+                    c = ChunkedCanvas(
+                        temp_pdf.name,
+                        lambda chunk: canvas.Canvas(chunk, pagesize=LETTER, pageCompression=1),
+                        EXCEL_PAGES_PER_CHUNK
+                    )
+                    width, height = LETTER
                     
-                    # Process each worksheet
-                    for ws in wb.worksheets:
-                        if not all_worksheets and ws != wb.active:
-                            continue
-                            
-                        # Add worksheet name as header
-                        c.setFont("Helvetica-Bold", 14)
-                        c.drawString(inch, height - inch, f"Sheet: {ws.title}")
-                        c.setFont("Helvetica", 10)
-                        
-                        # Calculate column widths
-                        col_widths = []
-                        for col in ws.columns:
-                            max_length = 0
-                            for cell in col:
-                                try:
-                                    if cell.value:
-                                        max_length = max(max_length, len(str(cell.value)))
-                                except:
-                                    pass
-                            col_widths.append(min(max_length * 7, 100))  # Scale factor and max width
-                        
-                        # Draw table
-                        y = height - 2*inch
-                        x = inch
-                        row_height = 20
-                        
-                        # Draw headers and data
-                        for row_idx, row in enumerate(ws.rows):
-                            if y < inch:  # Start new page if needed
-                                c.showPage()
-                                y = height - inch
+                    with span('layout'):
+                        try:
+                            # Process each worksheet
+                            for ws in wb.worksheets:
+                                if not all_worksheets and ws != wb.active:
+                                    continue
+                                
+                                # Add worksheet name as header
                                 c.setFont("Helvetica-Bold", 14)
-                                c.drawString(inch, y, f"Sheet: {ws.title} (continued)")
+                                c.drawString(inch, height - inch, f"Sheet: {ws.title}")
                                 c.setFont("Helvetica", 10)
-                                y -= row_height
                             
-                            x = inch
-                            for col_idx, cell in enumerate(row):
-                                # Draw cell border if gridlines are enabled
-                                if include_gridlines:
-                                    c.rect(x, y, col_widths[col_idx], row_height)
-                                
-                                # Draw cell content
-                                if cell.value is not None:
-                                    c.drawString(x + 2, y + 5, str(cell.value))
+                                # Calculate column widths from the leading rows, then draw every row
+                                col_widths, rows = sample_column_widths(
+                                    ws.iter_rows(values_only=True),
+                                    EXCEL_WIDTH_SAMPLE_ROWS
+                                )
+                            
+                                # Draw table
+                                y = height - 2*inch
+                                row_height = 20
+                                table = TableRenderer(c, col_widths, EXCEL_MAX_COLUMN_WIDTH, row_height, include_gridlines)
+                            
+                                # Draw headers and data
+                                for row in rows:
+                                    if y < inch:  # Start new page if needed
+                                        table.flush()
+                                        c.showPage()
+                                        y = height - inch
+                                        c.setFont("Helvetica-Bold", 14)
+                                        c.drawString(inch, y, f"Sheet: {ws.title} (continued)")
+                                        c.setFont("Helvetica", 10)
+                                        y -= row_height
                                 
-                                x += col_widths[col_idx]
+                                    table.draw_row(inch, y, row)
+                                    y -= row_height
                             
-                            y -= row_height
-                        
-                        # Start new page for next worksheet
-                        c.showPage()
+                                table.flush()
+                            
+                                # Start new page for next worksheet
+                                c.showPage()
+                        finally:
+                            # Read-only workbooks keep the file open until closed
+                            wb.close()
                     
-                    c.save()
+                    with span('write'):
+                        c.save()
+                    record_pages(c.getPageNumber() - 1)
                     
                     # Return the PDF file
                     return send_file(
@@ -766,7 +1332,6 @@ def convert_excel_to_pdf():
                 finally:
                     # Clean up temporary files
                     try:
-                        os.unlink(temp_excel.name)
                         os.unlink(temp_pdf.name)
                     except Exception as e:
                         logging.error(f"Error cleaning up temporary files: {str(e)}")
@@ -775,7 +1340,27 @@ def convert_excel_to_pdf():
         logging.error(f"Error processing Excel to PDF conversion: {str(e)}")
         return f"Error processing file: {str(e)}", 500
 
+def sample_column_widths(rows, sample_size):
+    """Estimate column widths from the first ``sample_size`` rows of a sheet.
+
+    Returns ``(col_widths, rows)``, where the returned ``rows`` yields the
+    sampled rows again followed by the rest, so the sheet is read only once
+    and at most ``sample_size`` rows are held in memory.
+    """
+    sample = list(itertools.islice(rows, sample_size))
+    max_lengths = []
+    for row in sample:
+        if len(row) > len(max_lengths):
+            max_lengths.extend([0] * (len(row) - len(max_lengths)))
+        for col_idx, value in enumerate(row):
+            if value:
+                max_lengths[col_idx] = max(max_lengths[col_idx], len(str(value)))
+    
+    col_widths = [min(length * 7, EXCEL_MAX_COLUMN_WIDTH) for length in max_lengths]  # Scale factor and max width
+    return col_widths, itertools.chain(sample, rows)
+
 @app.route('/convert-html-to-pdf', methods=['POST'])
+@cached_conversion
 def convert_html_to_pdf():
     try:
         # Get conversion options
@@ -783,7 +1368,7 @@ def convert_html_to_pdf():
         include_images = request.form.get('includeImages', 'true').lower() == 'true'
         page_breaks = request.form.get('pageBreaks', 'true').lower() == 'true'
 
-        # Configure pdfkit options
+        # Configure wkhtmltopdf options
         options = {
             'enable-local-file-access': None,
             'load-error-handling': 'ignore',
@@ -809,29 +1394,38 @@ def convert_html_to_pdf():
                     if not file.filename.lower().endswith(('.html', '.htm')):
                         return 'Invalid file format. Please upload an HTML file (.html or .htm)', 400
 
-                    # Save uploaded file temporarily
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.html') as temp_html:
-                        file.save(temp_html.name)
-                        pdfkit.from_file(temp_html.name, temp_pdf.name, options=options)
-                        os.unlink(temp_html.name)
+                    # The renderer reads its input from a file
+                    with Upload(file, UPLOAD_MEMORY_LIMIT, suffix='.html') as upload:
+                        render_html(upload.path(), temp_pdf.name, options)
 
                 elif 'url' in request.form:
                     # Handle URL input
                     url = request.form['url']
+                    page_dir = tempfile.mkdtemp()
                     try:
-                        # Validate URL by making a HEAD request
-                        response = requests.head(url, allow_redirects=True)
-                        response.raise_for_status()
-                        pdfkit.from_url(url, temp_pdf.name, options=options)
-                    except requests.exceptions.RequestException as e:
-                        return f'Error accessing URL: {str(e)}', 400
+                        # Fetch the page and its assets once; the renderer reads the local copy
+                        try:
+                            with span('fetch'):
+                                page_path = get_page_fetcher().fetch(url, page_dir)
+                        except requests.exceptions.RequestException as e:
+                            return f'Error accessing URL: {str(e)}', 400
+                        render_html(page_path, temp_pdf.name, options)
+                    finally:
+                        shutil.rmtree(page_dir, ignore_errors=True)
 
                 elif 'html' in request.form:
                     # Handle direct HTML input
                     html_content = request.form['html']
                     if not html_content.strip():
                         return 'No HTML content provided', 400
-                    pdfkit.from_string(html_content, temp_pdf.name, options=options)
+                    
+                    # Renderers read their input from a file, not stdin
+                    with tempfile.NamedTemporaryFile('w', encoding='utf-8', delete=False, suffix='.html') as temp_html:
+                        temp_html.write(html_content)
+                    try:
+                        render_html(temp_html.name, temp_pdf.name, options)
+                    finally:
+                        os.unlink(temp_html.name)
 
                 else:
                     return 'No input provided', 400
@@ -844,6 +1438,10 @@ def convert_html_to_pdf():
                     mimetype='application/pdf'
                 )
 
+            except RendererBusy as e:
+                logging.warning(f"HTML to PDF conversion rejected: {str(e)}")
+                return 'Server busy, please try again shortly', 503, {'Retry-After': str(HTML_RENDER_QUEUE_TIMEOUT)}
+
             except Exception as e:
                 logging.error(f"Error converting HTML to PDF: {str(e)}")
                 return f"Error converting file: {str(e)}", 500
@@ -859,6 +1457,166 @@ def convert_html_to_pdf():
         logging.error(f"Error processing HTML to PDF conversion: {str(e)}")
         return f"Error processing file: {str(e)}", 500
 
+def render_html(source, output_path, options):
+    """Render an HTML file or URL to PDF on the shared wkhtmltopdf pool."""
+    pool = get_html_render_pool(
+        WKHTMLTOPDF_PATH,
+        HTML_RENDER_WORKERS,
+        queue_timeout=HTML_RENDER_QUEUE_TIMEOUT,
+        render_timeout=HTML_RENDER_TIMEOUT,
+        max_jobs=HTML_RENDER_MAX_JOBS,
+        max_rss=HTML_RENDER_MAX_RSS
+    )
+    # Includes any wait for a free renderer
+    with span('render'):
+        pool.render(wkhtmltopdf_args(options) + [source, output_path])
+
+# Conversions that can be queued through /jobs
+JOB_OPERATIONS = {
+    'convert-jpg-to-pdf',
+    'convert-pdf-to-jpeg',
+    'convert-pdf-to-word',
+    'convert-word-to-pdf',
+    'convert-powerpoint-to-pdf',
+    'convert-excel-to-pdf',
+    'convert-html-to-pdf',
+    'add-watermark',
+    'rotate-pdf',
+    'add-page-numbers',
+    'process-pdf',
+    'merge-pdf',
+    'split-pdf',
+    'extract-pages',
+    'remove-pages',
+}
+
+def run_job_conversion(operation, form, files, job_dir):
+    """Replay a queued conversion through its normal route and store the result."""
+    data = dict(form)
+    handles = []
+    try:
+        for field, filename, path in files:
+            handle = open(path, 'rb')
+            handles.append(handle)
+            data.setdefault(field, []).append((handle, filename))
+
+        # Closing the response runs what the route left for after sending:
+        # metrics, caching the result and releasing the upload's temp files
+        with app.test_client() as client:
+            with client.post(f'/{operation}', data=data, content_type='multipart/form-data') as response:
+                if response.status_code >= 400:
+                    if response.is_json:
+                        body = response.get_json()
+                        raise RuntimeError(body.get('details') or body.get('error') or 'Conversion failed')
+                    raise RuntimeError(response.get_data(as_text=True) or 'Conversion failed')
+
+                _, params = parse_options_header(response.headers.get('Content-Disposition', ''))
+                result_path = os.path.join(job_dir, 'result')
+                with open(result_path, 'wb') as result_file:
+                    for chunk in response.iter_encoded():
+                        result_file.write(chunk)
+    finally:
+        for handle in handles:
+            handle.close()
+
+    return result_path, params.get('filename', 'result'), response.mimetype
+
+job_queue = JobQueue(
+    os.path.join(DATA_DIR, 'jobs.db'),
+    JOB_FOLDER,
+    run_job_conversion,
+    workers=JOB_WORKERS
+)
+
+def job_status(job):
+    """Build the public status payload for a job record."""
+    status = {
+        'job_id': job['id'],
+        'operation': job['operation'],
+        'status': job['status'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at'],
+    }
+    if job['status'] == 'failed':
+        status['error'] = job['error']
+    if job['status'] == 'done':
+        status['result_url'] = url_for('get_job_result', job_id=job['id'])
+    return status
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    try:
+        operation = request.form.get('operation', '').strip('/')
+        if operation not in JOB_OPERATIONS:
+            return jsonify({'error': f'Unsupported operation: {operation}'}), 400
+
+        if not request.files and operation != 'convert-html-to-pdf':
+            return jsonify({'error': 'No file uploaded'}), 400
+
+        form = {key: values for key, values in request.form.lists() if key != 'operation'}
+        files = list(request.files.items(multi=True))
+
+        job_queue.purge(JOB_RETENTION)
+        job_id = job_queue.submit(operation, form, files)
+
+        return jsonify({
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': url_for('get_job', job_id=job_id)
+        }), 202
+
+    except Exception as e:
+        logger.error(f'Error submitting job: {str(e)}')
+        return jsonify({'error': 'Failed to submit job'}), 500
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_status(job))
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] == 'failed':
+        return jsonify({'error': 'Job failed', 'details': job['error']}), 409
+    if job['status'] != 'done':
+        return jsonify({'error': 'Job is not finished yet', 'status': job['status']}), 409
+
+    return send_file(
+        job['result_path'],
+        mimetype=job['result_mimetype'],
+        as_attachment=True,
+        download_name=job['result_name']
+    )
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def delete_job(job_id):
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] in ('queued', 'running'):
+        return jsonify({'error': 'Job is still in progress'}), 409
+
+    job_queue.delete(job_id)
+    return jsonify({'message': 'Job deleted'})
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(result_cache.stats())
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    if METRICS_TOKEN:
+        auth_header = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(auth_header.encode(), f'Bearer {METRICS_TOKEN}'.encode()):
+            return jsonify({'error': 'Invalid metrics token'}), 401
+    return Response(metrics.expose(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/<path:path>')
 def serve_file(path):
     try:
@@ -891,12 +1649,48 @@ def not_found(e):
     logger.error(f'404 error: {e}')
     return f"File not found: {e}", 404
 
+def max_upload_size():
+    """Return the largest request body accepted by the current route."""
+    if request.endpoint == 'merge_pdf':
+        return MERGE_MAX_CONTENT_LENGTH
+    return MAX_CONTENT_LENGTH
+
+class UploadRequest(Request):
+    # werkzeug enforces this while parsing bodies sent without a length
+    @property
+    def max_content_length(self):
+        return max_upload_size()
+
+    def _load_form_data(self):
+        # Reading and parsing the body happens on the first access to the form
+        with span('receive'):
+            super()._load_form_data()
+
+app.request_class = UploadRequest
+
+@app.before_request
+def enforce_upload_limit():
+    # Reject oversized bodies before any route reads them
+    if request.content_length is not None and request.content_length > max_upload_size():
+        abort(413)
+    if request.content_length is None:
+        # A body sent without a length (chunked) is only found to be too large
+        # while it is parsed; parse it here, where RequestEntityTooLarge becomes
+        # a 413, rather than inside a route's error handling
+        request.form
+
+@app.errorhandler(413)
+def request_too_large(e):
+    logger.error(f'413 error: request of {request.content_length} bytes')
+    return jsonify({'error': f'File too large. The maximum upload size is {max_upload_size() // (1024 * 1024)} MB.'}), 413
+
 @app.errorhandler(500)
 def server_error(e):
     logger.error(f'500 error: {e}')
     return f"Internal server error: {e}", 500
 
 @app.route('/add-watermark', methods=['POST'])
+@cached_conversion
 def add_watermark():
     try:
         if 'file' not in request.files:
@@ -906,149 +1700,41 @@ def add_watermark():
         if not file or not file.filename.lower().endswith('.pdf'):
             return jsonify({'error': 'Invalid file format. Please upload a PDF file.'}), 400
 
-        # Create temporary files
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as pdf_temp:
-            file.save(pdf_temp.name)
-            pdf_path = pdf_temp.name
-
-        watermark_type = request.form.get('watermark_type', 'text')
-        position = request.form.get('position', 'center')
-        rotation = int(request.form.get('rotation', 0))
+        # Get watermark parameters
+        options = watermark_options(request.form)
         page_range = request.form.get('page_range', '')
 
+        if options['watermark_type'] != 'text':
+            if 'watermark_image' not in request.files:
+                return jsonify({'error': 'No watermark image uploaded'}), 400
+
+            # Read the watermark image once; it is embedded once per page size
+            options['image'] = request.files['watermark_image'].read()
+
+        # Small uploads are read straight from memory
+        upload = Upload(file, UPLOAD_MEMORY_LIMIT, suffix='.pdf')
+
         # Create output PDF
         with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as output_temp:
             output_path = output_temp.name
 
         # Read the PDF
-        pdf_reader = PyPDF2.PdfReader(pdf_path)
-        pdf_writer = PyPDF2.PdfWriter()
+        with span('parse'):
+            pdf_reader = PyPDF2.PdfReader(upload.open())
+            pdf_writer = PyPDF2.PdfWriter()
+            for page in pdf_reader.pages:
+                pdf_writer.add_page(page)
 
-        # Process each page
-        for page_num in range(len(pdf_reader.pages)):
-            # Check if this page should be watermarked
-            if page_range:
-                page_ranges = parse_page_range(page_range)
-                if page_num + 1 not in page_ranges:
-                    pdf_writer.add_page(pdf_reader.pages[page_num])
-                    continue
-
-            page = pdf_reader.pages[page_num]
-            
-            # Create a new page with watermark
-            packet = io.BytesIO()
-            can = canvas.Canvas(packet, pagesize=page.mediabox)
-            
-            # Get page dimensions
-            width = float(page.mediabox.width)
-            height = float(page.mediabox.height)
-
-            if watermark_type == 'text':
-                # Get text watermark parameters
-                text = request.form.get('watermark_text', '')
-                font_size = int(request.form.get('font_size', 16))
-                font_color = request.form.get('font_color', '#000000')
-                opacity = float(request.form.get('opacity', 50)) / 100
-
-                # Set font and color
-                can.setFont("Helvetica", font_size)
-                r, g, b = hex_to_rgb(font_color)
-                can.setFillColorRGB(r, g, b, alpha=opacity)
-
-                # Calculate text position based on position parameter
-                text_width = can.stringWidth(text, "Helvetica", font_size)
-                text_height = font_size
-
-                if position == 'center':
-                    x = (width - text_width) / 2
-                    y = (height - text_height) / 2
-                elif position == 'top-left':
-                    x = 50
-                    y = height - 50
-                elif position == 'top-right':
-                    x = width - text_width - 50
-                    y = height - 50
-                elif position == 'bottom-left':
-                    x = 50
-                    y = 50
-                else:  # bottom-right
-                    x = width - text_width - 50
-                    y = 50
-
-                # Save the current state
-                can.saveState()
-                # Translate to center and rotate
-                can.translate(x + text_width/2, y + text_height/2)
-                can.rotate(rotation)
-                can.translate(-(x + text_width/2), -(y + text_height/2))
-                # Draw text
-                can.drawString(x, y, text)
-                # Restore the state
-                can.restoreState()
-
-            else:  # image watermark
-                if 'watermark_image' not in request.files:
-                    return jsonify({'error': 'No watermark image uploaded'}), 400
-
-                image_file = request.files['watermark_image']
-                image_opacity = float(request.form.get('image_opacity', 50)) / 100
-
-                # Save watermark image temporarily
-                with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as img_temp:
-                    image_file.save(img_temp.name)
-                    img_path = img_temp.name
-
-                # Get image dimensions
-                img = Image.open(img_path)
-                img_width, img_height = img.size
-
-                # Calculate image position and size
-                max_size = min(width, height) * 0.5  # 50% of page size
-                scale = min(max_size / img_width, max_size / img_height)
-                new_width = img_width * scale
-                new_height = img_height * scale
-
-                if position == 'center':
-                    x = (width - new_width) / 2
-                    y = (height - new_height) / 2
-                elif position == 'top-left':
-                    x = 50
-                    y = height - new_height - 50
-                elif position == 'top-right':
-                    x = width - new_width - 50
-                    y = height - new_height - 50
-                elif position == 'bottom-left':
-                    x = 50
-                    y = 50
-                else:  # bottom-right
-                    x = width - new_width - 50
-                    y = 50
-
-                # Draw image with rotation
-                can.saveState()
-                can.translate(x + new_width/2, y + new_height/2)
-                can.rotate(rotation)
-                can.translate(-(x + new_width/2), -(y + new_height/2))
-                can.drawImage(img_path, x, y, width=new_width, height=new_height)
-                can.restoreState()
-
-                # Clean up temporary image file
-                os.unlink(img_path)
-
-            can.save()
-            packet.seek(0)
-
-            # Create a new PDF with the watermark
-            new_pdf = PyPDF2.PdfReader(packet)
-            page.merge_page(new_pdf.pages[0])
-            pdf_writer.add_page(page)
+        with span('watermark'):
+            apply_watermark(pdf_writer, options, parse_page_range(page_range))
 
         # Save the watermarked PDF
-        with open(output_path, 'wb') as output_file:
+        with span('write'), open(output_path, 'wb') as output_file:
             pdf_writer.write(output_file)
+        record_pages(len(pdf_writer.pages))
 
         # Clean up temporary files
-        os.unlink(pdf_path)
+        upload.close()
 
         # Return the watermarked PDF
         return send_file(
@@ -1063,13 +1749,34 @@ def add_watermark():
         return jsonify({'error': 'An error occurred while adding watermark'}), 500
 
     finally:
-        # Clean up output file
+        # Clean up the upload and output file
+        if 'upload' in locals():
+            upload.close()
         if 'output_path' in locals():
             try:
                 os.unlink(output_path)
             except:
                 pass
 
+def watermark_options(params):
+    """Read watermark settings from form fields or a pipeline step.
+
+    For image watermarks the caller adds the image bytes as ``image``.
+    """
+    options = {
+        'watermark_type': params.get('watermark_type', 'text'),
+        'position': params.get('position', 'center'),
+        'rotation': int(params.get('rotation', 0)),
+    }
+    if options['watermark_type'] == 'text':
+        options['text'] = params.get('watermark_text', '')
+        options['font_size'] = int(params.get('font_size', 16))
+        options['font_color'] = params.get('font_color', '#000000')
+        options['opacity'] = float(params.get('opacity', 50)) / 100
+    else:  # image watermark
+        options['image_opacity'] = float(params.get('image_opacity', 50)) / 100
+    return options
+
 def hex_to_rgb(hex_color):
     """Convert hex color to RGB values."""
     hex_color = hex_color.lstrip('#')
@@ -1092,7 +1799,179 @@ def parse_page_range(page_range):
     
     return sorted(list(pages))
 
+def watermark_origin(position, width, height, box_width, box_height, top_inset):
+    """Return the lower-left corner of a watermark box for a position name."""
+    if position == 'center':
+        return (width - box_width) / 2, (height - box_height) / 2
+    elif position == 'top-left':
+        return 50, height - top_inset - 50
+    elif position == 'top-right':
+        return width - box_width - 50, height - top_inset - 50
+    elif position == 'bottom-left':
+        return 50, 50
+    else:  # bottom-right
+        return width - box_width - 50, 50
+
+def render_watermark(width, height, options):
+    """Render the watermark for one page size into a single-page PDF."""
+    packet = io.BytesIO()
+    can = canvas.Canvas(packet, pagesize=(width, height))
+    rotation = options['rotation']
+
+    if options['watermark_type'] == 'text':
+        text = options['text']
+        font_size = options['font_size']
+
+        # Set font and color
+        can.setFont("Helvetica", font_size)
+        r, g, b = hex_to_rgb(options['font_color'])
+        can.setFillColorRGB(r, g, b, alpha=options['opacity'])
+
+        text_width = can.stringWidth(text, "Helvetica", font_size)
+        text_height = font_size
+        x, y = watermark_origin(options['position'], width, height, text_width, text_height, 0)
+
+        # Rotate around the centre of the text
+        can.saveState()
+        can.translate(x + text_width/2, y + text_height/2)
+        can.rotate(rotation)
+        can.translate(-(x + text_width/2), -(y + text_height/2))
+        can.drawString(x, y, text)
+        can.restoreState()
+
+    else:  # image watermark
+        image = reportlab_utils.ImageReader(io.BytesIO(options['image']))
+        img_width, img_height = image.getSize()
+
+        # Scale image to 50% of the page size
+        max_size = min(width, height) * 0.5
+        scale = min(max_size / img_width, max_size / img_height)
+        new_width = img_width * scale
+        new_height = img_height * scale
+        x, y = watermark_origin(options['position'], width, height, new_width, new_height, new_height)
+
+        # Rotate around the centre of the image
+        can.saveState()
+        can.translate(x + new_width/2, y + new_height/2)
+        can.rotate(rotation)
+        can.translate(-(x + new_width/2), -(y + new_height/2))
+        can.drawImage(image, x, y, width=new_width, height=new_height, mask='auto')
+        can.restoreState()
+
+    can.save()
+    packet.seek(0)
+    return PyPDF2.PdfReader(packet).pages[0]
+
+def apply_watermark(pdf_writer, options, page_numbers=None):
+    """Stamp a watermark on the writer's pages.
+
+    The watermark is rendered once per distinct page size and every page of
+    that size references the same Form XObject, so runtime and output size
+    stay almost flat as the page count grows.
+    """
+    stamper = OverlayStamper(pdf_writer)
+    selected = set(page_numbers) if page_numbers else None
+    xobjects = {}
+
+    for page_num, page in enumerate(pdf_writer.pages, start=1):
+        if selected is not None and page_num not in selected:
+            continue
+
+        width = float(page.mediabox.width)
+        height = float(page.mediabox.height)
+        if (width, height) not in xobjects:
+            xobjects[(width, height)] = stamper.add_overlay(render_watermark(width, height, options))
+
+        stamper.stamp(page, xobjects[(width, height)])
+
+class OverlayStamper:
+    """Draw rendered overlay pages on top of existing writer pages.
+
+    Each overlay is registered once as a Form XObject and painted with a tiny
+    shared ``Do`` content stream, so the page's own content is never parsed
+    or copied the way ``PageObject.merge_page`` does.
+    """
+
+    def __init__(self, pdf_writer):
+        self.pdf_writer = pdf_writer
+        self.count = 0
+        self.streams = {}
+
+    def _shared_stream(self, data):
+        """Return a reference to a content stream, adding it on first use."""
+        if data not in self.streams:
+            stream = generic.DecodedStreamObject()
+            stream.set_data(data)
+            self.streams[data] = self.pdf_writer._add_object(stream)
+        return self.streams[data]
+
+    def add_overlay(self, overlay_page):
+        """Register a rendered overlay page as a Form XObject and return its name."""
+        width = float(overlay_page.mediabox.width)
+        height = float(overlay_page.mediabox.height)
+
+        contents = overlay_page.get_contents()
+        if isinstance(contents, generic.StreamObject) and not isinstance(contents, generic.ContentStream):
+            # Reuse the already-compressed stream data as is
+            form = contents.clone(self.pdf_writer)
+        else:
+            form = generic.DecodedStreamObject()
+            form.set_data(contents.get_data() if contents is not None else b'')
+            form = form.flate_encode()
+        form.update({
+            generic.NameObject('/Type'): generic.NameObject('/XObject'),
+            generic.NameObject('/Subtype'): generic.NameObject('/Form'),
+            generic.NameObject('/BBox'): generic.ArrayObject([generic.FloatObject(0), generic.FloatObject(0), generic.FloatObject(width), generic.FloatObject(height)]),
+        })
+        if '/Resources' in overlay_page:
+            form[generic.NameObject('/Resources')] = overlay_page['/Resources'].get_object().clone(self.pdf_writer)
+
+        name = generic.NameObject(f'/PdfToolsOverlay{self.count}')
+        self.count += 1
+        return name, self.pdf_writer._add_object(form)
+
+    def stamp(self, page, overlay):
+        """Paint a registered overlay on top of a page already in the writer."""
+        name, form_ref = overlay
+
+        # Reference the shared XObject from the page resources
+        if '/Resources' in page:
+            resources = page['/Resources'].get_object()
+        else:
+            resources = generic.DictionaryObject()
+            page[generic.NameObject('/Resources')] = resources
+        if '/XObject' in resources:
+            xobjects = resources['/XObject'].get_object()
+        else:
+            xobjects = generic.DictionaryObject()
+            resources[generic.NameObject('/XObject')] = xobjects
+        # Overlays stamped by an earlier pass may already use this name
+        base_name = name
+        suffix = 0
+        while name in xobjects and xobjects.raw_get(name) != form_ref:
+            suffix += 1
+            name = generic.NameObject(f'{base_name}_{suffix}')
+        xobjects[name] = form_ref
+
+        # Wrap the original content in q/Q and append the overlay
+        left = float(page.mediabox.left)
+        bottom = float(page.mediabox.bottom)
+        paint = f'Q q 1 0 0 1 {left:g} {bottom:g} cm {name} Do Q'.encode()
+
+        contents = page.raw_get('/Contents') if '/Contents' in page else None
+        content_array = generic.ArrayObject([self._shared_stream(b'q')])
+        if isinstance(contents, generic.ArrayObject):
+            content_array.extend(contents)
+        elif contents is not None:
+            if isinstance(contents.get_object(), generic.ArrayObject):
+                content_array.extend(contents.get_object())
+            else:
+                content_array.append(contents)
+        content_array.append(self._shared_stream(paint))
+        page[generic.NameObject('/Contents')] = content_array
+
 @app.route('/rotate-pdf', methods=['POST'])
+@cached_conversion
 def rotate_pdf():
     try:
         if 'file' not in request.files:
@@ -1107,38 +1986,65 @@ def rotate_pdf():
         rotation_scope = request.form.get('rotation_scope', 'all')
         page_range = request.form.get('page_range', '')
 
-        # Create temporary files
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as pdf_temp:
-            file.save(pdf_temp.name)
-            pdf_path = pdf_temp.name
+        # 'incremental' appends only the rotated pages to the original file
+        save_mode = request.form.get('save_mode', 'full')
+        if save_mode not in ('full', 'incremental'):
+            return jsonify({'error': 'save_mode must be full or incremental'}), 400
+
+        def rotate(pdf):
+            # Rotate every page, or only the selected ones
+            if rotation_scope != 'specific':
+                return apply_rotation(pdf, rotation_angle)
+            if page_range:
+                return apply_rotation(pdf, rotation_angle, parse_page_range(page_range))
+            return []
+
+        # Small uploads are read straight from memory
+        upload = Upload(file, UPLOAD_MEMORY_LIMIT, suffix='.pdf')
+
+        if save_mode == 'incremental':
+            handle = upload.open()
+            with span('parse'):
+                pdf_reader = PyPDF2.PdfReader(handle)
+            with span('rotate'):
+                rotated = rotate(pdf_reader)
+            try:
+                with span('write'):
+                    update = incremental_update(pdf_reader, [(page.indirect_reference, page) for page in rotated])
+            except ValueError as e:
+                handle.close()
+                return jsonify({'error': str(e)}), 400
+
+            # Send the original bytes unchanged, followed by the update
+            handle.seek(0)
+            chunks = itertools.chain(iter(lambda: handle.read(1024 * 1024), b''), [update])
+            record_pages(len(rotated))
+            response = stream_pdf_response(chunks, 'rotated.pdf', 'application/pdf', [handle, upload])
+            # The response closes the upload once it has been sent
+            upload = None
+            return response
 
         # Create output PDF
         with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as output_temp:
             output_path = output_temp.name
 
         # Read the PDF
-        pdf_reader = PyPDF2.PdfReader(pdf_path)
-        pdf_writer = PyPDF2.PdfWriter()
+        with span('parse'):
+            pdf_reader = PyPDF2.PdfReader(upload.open())
+            pdf_writer = PyPDF2.PdfWriter()
+            for page in pdf_reader.pages:
+                pdf_writer.add_page(page)
 
-        # Process each page
-        for page_num in range(len(pdf_reader.pages)):
-            page = pdf_reader.pages[page_num]
-            
-            # Check if this page should be rotated
-            if rotation_scope == 'specific' and page_range:
-                page_ranges = parse_page_range(page_range)
-                if page_num + 1 in page_ranges:
-                    # Rotate the page
-                    page.rotate(rotation_angle)
-            
-            pdf_writer.add_page(page)
+        with span('rotate'):
+            rotate(pdf_writer)
 
         # Save the rotated PDF
-        with open(output_path, 'wb') as output_file:
+        with span('write'), open(output_path, 'wb') as output_file:
             pdf_writer.write(output_file)
+        record_pages(len(pdf_writer.pages))
 
         # Clean up temporary files
-        os.unlink(pdf_path)
+        upload.close()
 
         # Return the rotated PDF
         return send_file(
@@ -1153,14 +2059,30 @@ def rotate_pdf():
         return jsonify({'error': 'An error occurred while rotating PDF'}), 500
 
     finally:
-        # Clean up output file
+        # Clean up the upload and output file
+        if 'upload' in locals() and upload is not None:
+            upload.close()
         if 'output_path' in locals():
             try:
                 os.unlink(output_path)
             except:
                 pass
 
+def apply_rotation(pdf, rotation_angle, page_numbers=None):
+    """Rotate the pages of a reader or writer, or only ``page_numbers`` if given.
+
+    Returns the pages that were rotated.
+    """
+    selected = set(page_numbers) if page_numbers else None
+    rotated = []
+    for page_num, page in enumerate(pdf.pages, start=1):
+        if selected is None or page_num in selected:
+            page.rotate(rotation_angle)
+            rotated.append(page)
+    return rotated
+
 @app.route('/add-page-numbers', methods=['POST'])
+@cached_conversion
 def add_page_numbers():
     try:
         if 'file' not in request.files:
@@ -1171,101 +2093,33 @@ def add_page_numbers():
             return jsonify({'error': 'Invalid file format. Please upload a PDF file.'}), 400
 
         # Get page number parameters
-        number_style = request.form.get('number_style', '1')
-        number_position = request.form.get('number_position', 'bottom-right')
+        options = page_number_options(request.form)
         page_range = request.form.get('page_range', '')
-        font_size = int(request.form.get('font_size', 10))
-        font_color = request.form.get('font_color', '#000000')
 
-        # Create temporary files
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as pdf_temp:
-            file.save(pdf_temp.name)
-            pdf_path = pdf_temp.name
+        # Small uploads are read straight from memory
+        upload = Upload(file, UPLOAD_MEMORY_LIMIT, suffix='.pdf')
 
         # Create output PDF
         with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as output_temp:
             output_path = output_temp.name
 
         # Read the PDF
-        pdf_reader = PyPDF2.PdfReader(pdf_path)
-        pdf_writer = PyPDF2.PdfWriter()
+        with span('parse'):
+            pdf_reader = PyPDF2.PdfReader(upload.open())
+            pdf_writer = PyPDF2.PdfWriter()
+            for page in pdf_reader.pages:
+                pdf_writer.add_page(page)
 
-        # Process each page
-        for page_num in range(len(pdf_reader.pages)):
-            page = pdf_reader.pages[page_num]
-            
-            # Check if this page should be numbered
-            if page_range:
-                page_ranges = parse_page_range(page_range)
-                if page_num + 1 not in page_ranges:
-                    pdf_writer.add_page(page)
-                    continue
-
-            # Create a new page with page number
-            packet = io.BytesIO()
-            can = canvas.Canvas(packet, pagesize=page.mediabox)
-            
-            # Get page dimensions
-            width = float(page.mediabox.width)
-            height = float(page.mediabox.height)
-
-            # Set font and color
-            can.setFont("Helvetica", font_size)
-            r, g, b = hex_to_rgb(font_color)
-            can.setFillColorRGB(r, g, b)
-
-            # Convert page number to desired style
-            page_number = page_num + 1
-            if number_style == 'i':
-                page_number = roman.toRoman(page_number).lower()
-            elif number_style == 'I':
-                page_number = roman.toRoman(page_number)
-            elif number_style == 'a':
-                page_number = chr(96 + page_number)  # a=97, b=98, etc.
-            elif number_style == 'A':
-                page_number = chr(64 + page_number)  # A=65, B=66, etc.
-
-            # Calculate text position based on position parameter
-            text = str(page_number)
-            text_width = can.stringWidth(text, "Helvetica", font_size)
-            text_height = font_size
-
-            # Set position based on parameter
-            if number_position == 'bottom-right':
-                x = width - text_width - 50
-                y = 50
-            elif number_position == 'bottom-center':
-                x = (width - text_width) / 2
-                y = 50
-            elif number_position == 'bottom-left':
-                x = 50
-                y = 50
-            elif number_position == 'top-right':
-                x = width - text_width - 50
-                y = height - 50
-            elif number_position == 'top-center':
-                x = (width - text_width) / 2
-                y = height - 50
-            else:  # top-left
-                x = 50
-                y = height - 50
-
-            # Draw page number
-            can.drawString(x, y, text)
-            can.save()
-            packet.seek(0)
-
-            # Create a new PDF with the page number
-            new_pdf = PyPDF2.PdfReader(packet)
-            page.merge_page(new_pdf.pages[0])
-            pdf_writer.add_page(page)
+        with span('page_numbers'):
+            apply_page_numbers(pdf_writer, options, parse_page_range(page_range))
 
         # Save the numbered PDF
-        with open(output_path, 'wb') as output_file:
+        with span('write'), open(output_path, 'wb') as output_file:
             pdf_writer.write(output_file)
+        record_pages(len(pdf_writer.pages))
 
         # Clean up temporary files
-        os.unlink(pdf_path)
+        upload.close()
 
         # Return the numbered PDF
         return send_file(
@@ -1280,13 +2134,389 @@ def add_page_numbers():
         return jsonify({'error': 'An error occurred while adding page numbers'}), 500
 
     finally:
-        # Clean up output file
+        # Clean up the upload and output file
+        if 'upload' in locals():
+            upload.close()
+        if 'output_path' in locals():
+            try:
+                os.unlink(output_path)
+            except:
+                pass
+
+def page_number_options(params):
+    """Read page number settings from form fields or a pipeline step."""
+    return {
+        'number_style': params.get('number_style', '1'),
+        'number_position': params.get('number_position', 'bottom-right'),
+        'font_size': int(params.get('font_size', 10)),
+        'font_color': params.get('font_color', '#000000'),
+    }
+
+def format_page_number(page_number, number_style):
+    """Convert a page number to the requested numbering style."""
+    if number_style == 'i':
+        return roman.toRoman(page_number).lower()
+    elif number_style == 'I':
+        return roman.toRoman(page_number)
+    elif number_style == 'a':
+        return chr(96 + page_number)  # a=97, b=98, etc.
+    elif number_style == 'A':
+        return chr(64 + page_number)  # A=65, B=66, etc.
+    return str(page_number)
+
+def page_number_origin(position, width, height, text_width):
+    """Return where a page number of the given width is drawn."""
+    if position == 'bottom-right':
+        return width - text_width - 50, 50
+    elif position == 'bottom-center':
+        return (width - text_width) / 2, 50
+    elif position == 'bottom-left':
+        return 50, 50
+    elif position == 'top-right':
+        return width - text_width - 50, height - 50
+    elif position == 'top-center':
+        return (width - text_width) / 2, height - 50
+    else:  # top-left
+        return 50, height - 50
+
+def render_page_numbers(labels, options):
+    """Render all page number overlays into one multi-page PDF.
+
+    ``labels`` is a list of ``(width, height, text)`` tuples; the returned
+    pages are in the same order. Using a single canvas and a single parse
+    avoids paying reportlab and PdfReader setup once per page.
+    """
+    packet = io.BytesIO()
+    can = canvas.Canvas(packet)
+    font_size = options['font_size']
+    r, g, b = hex_to_rgb(options['font_color'])
+
+    for width, height, text in labels:
+        can.setPageSize((width, height))
+        can.setFont("Helvetica", font_size)
+        can.setFillColorRGB(r, g, b)
+
+        text_width = can.stringWidth(text, "Helvetica", font_size)
+        x, y = page_number_origin(options['number_position'], width, height, text_width)
+        can.drawString(x, y, text)
+        can.showPage()
+
+    can.save()
+    packet.seek(0)
+    return PyPDF2.PdfReader(packet).pages
+
+def apply_page_numbers(pdf_writer, options, page_numbers=None):
+    """Stamp page numbers on the writer's pages in a single batched pass."""
+    selected = set(page_numbers) if page_numbers else None
+    targets = []
+    labels = []
+
+    for page_num, page in enumerate(pdf_writer.pages, start=1):
+        if selected is not None and page_num not in selected:
+            continue
+        targets.append(page)
+        labels.append((
+            float(page.mediabox.width),
+            float(page.mediabox.height),
+            format_page_number(page_num, options['number_style'])
+        ))
+
+    if not targets:
+        return
+
+    stamper = OverlayStamper(pdf_writer)
+    for page, overlay_page in zip(targets, render_page_numbers(labels, options)):
+        stamper.stamp(page, stamper.add_overlay(overlay_page))
+
+# Operations a /process-pdf pipeline can chain, each applied to the writer in place
+PIPELINE_OPERATIONS = {
+    'rotate': apply_rotation,
+    'watermark': apply_watermark,
+    'page_numbers': apply_page_numbers,
+}
+PIPELINE_MAX_STEPS = 20
+
+def read_pipeline_step(step, images):
+    """Validate one pipeline step and return ``(operation, options, page_numbers)``.
+
+    Raises ValueError with a message for the client if the step is invalid.
+    """
+    if not isinstance(step, dict) or step.get('operation') not in PIPELINE_OPERATIONS:
+        raise ValueError(f'Unknown operation. Use one of: {", ".join(PIPELINE_OPERATIONS)}')
+
+    operation = step['operation']
+    page_numbers = parse_page_range(str(step.get('page_range', '')))
+    if operation == 'rotate':
+        options = int(step.get('rotation_angle', 90))
+        if options % 90:
+            raise ValueError('rotation_angle must be a multiple of 90')
+    elif operation == 'watermark':
+        options = watermark_options(step)
+        if options['watermark_type'] != 'text':
+            # Steps name the upload field holding their image; each is read once
+            field = step.get('image_field', 'watermark_image')
+            if field not in request.files:
+                raise ValueError(f'No watermark image uploaded in {field}')
+            if field not in images:
+                images[field] = request.files[field].read()
+            options['image'] = images[field]
+    else:
+        options = page_number_options(step)
+    return operation, options, page_numbers
+
+@app.route('/process-pdf', methods=['POST'])
+@cached_conversion
+def process_pdf():
+    """Apply a chain of page operations to one PDF, parsing and writing it once.
+
+    ``operations`` is a JSON list of steps run in order. Each step is an
+    object with an ``operation`` of ``rotate``, ``watermark`` or
+    ``page_numbers``, an optional ``page_range``, and the same settings as
+    the matching single-operation route. Image watermarks read their image
+    from the upload field named by ``image_field`` (``watermark_image``).
+    """
+    try:
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file uploaded'}), 400
+        
+        file = request.files['file']
+        if not file or not file.filename.lower().endswith('.pdf'):
+            return jsonify({'error': 'Invalid file format. Please upload a PDF file.'}), 400
+
+        # Check every step before any work is done
+        try:
+            steps = json.loads(request.form.get('operations', ''))
+            if not isinstance(steps, list) or not 1 <= len(steps) <= PIPELINE_MAX_STEPS:
+                raise ValueError(f'operations must be a JSON list of 1 to {PIPELINE_MAX_STEPS} steps')
+            images = {}
+            pipeline = [read_pipeline_step(step, images) for step in steps]
+        except ValueError as e:
+            return jsonify({'error': f'Invalid operations: {str(e)}'}), 400
+
+        # Small uploads are read straight from memory
+        upload = Upload(file, UPLOAD_MEMORY_LIMIT, suffix='.pdf')
+
+        # Create output PDF
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as output_temp:
+            output_path = output_temp.name
+
+        # Read the PDF once
+        with span('parse'):
+            pdf_reader = PyPDF2.PdfReader(upload.open())
+            pdf_writer = PyPDF2.PdfWriter()
+            for page in pdf_reader.pages:
+                pdf_writer.add_page(page)
+
+        for operation, options, page_numbers in pipeline:
+            with span(operation):
+                PIPELINE_OPERATIONS[operation](pdf_writer, options, page_numbers)
+
+        # Write the result once
+        with span('write'), open(output_path, 'wb') as output_file:
+            pdf_writer.write(output_file)
+        record_pages(len(pdf_writer.pages))
+
+        # Clean up temporary files
+        upload.close()
+
+        # Return the processed PDF
+        return send_file(
+            output_path,
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name='processed.pdf'
+        )
+
+    except Exception as e:
+        logging.error(f"Error processing PDF: {str(e)}")
+        return jsonify({'error': 'An error occurred while processing PDF'}), 500
+
+    finally:
+        # Clean up the upload and output file
+        if 'upload' in locals():
+            upload.close()
         if 'output_path' in locals():
             try:
                 os.unlink(output_path)
             except:
                 pass
 
+# Page copying: merge, split, extract and remove. These routes are not
+# cached: copying pages costs about as much as reading a cached copy, and
+# their outputs can be larger than the whole result cache.
+@app.route('/merge-pdf', methods=['POST'])
+def merge_pdf():
+    """Merge the uploaded ``files`` into one PDF, in upload order.
+
+    Pages are copied without decoding their content and the result is
+    streamed while it is written, so memory use does not grow with the
+    size or number of the inputs.
+    """
+    resources = []
+    try:
+        files = request.files.getlist('files')
+        if len(files) < 2:
+            return jsonify({'error': 'Please upload at least two PDF files'}), 400
+        for file in files:
+            if not file or not file.filename.lower().endswith('.pdf'):
+                return jsonify({'error': 'Invalid file format. Please upload PDF files only.'}), 400
+
+        sources = []
+        with span('parse'):
+            for file in files:
+                reader = open_pdf_upload(file, resources)
+                sources.append((reader, range(len(reader.pages))))
+
+        record_pages(sum(len(indices) for _, indices in sources))
+        return stream_pdf_response(stream_pdf(sources), 'merged.pdf', 'application/pdf', resources)
+
+    except Exception as e:
+        close_all(resources)
+        logging.error(f"Error merging PDFs: {str(e)}")
+        return jsonify({'error': 'An error occurred while merging PDFs'}), 500
+
+@app.route('/split-pdf', methods=['POST'])
+def split_pdf():
+    """Split a PDF into one file per range, returned as a ZIP archive.
+
+    ``ranges`` is a comma-separated list such as ``1-3,4-6``; each range
+    becomes one file. Without ranges every page becomes its own file.
+    """
+    resources = []
+    try:
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file uploaded'}), 400
+        
+        file = request.files['file']
+        if not file or not file.filename.lower().endswith('.pdf'):
+            return jsonify({'error': 'Invalid file format. Please upload a PDF file.'}), 400
+
+        with span('parse'):
+            reader = open_pdf_upload(file, resources)
+            page_count = len(reader.pages)
+        try:
+            ranges = request.form.get('ranges', '').strip()
+            if ranges:
+                parts = [select_pages(part, page_count) for part in ranges.split(',')]
+            else:
+                parts = [[index] for index in range(page_count)]
+        except ValueError as e:
+            close_all(resources)
+            return jsonify({'error': f'Invalid page range: {str(e)}'}), 400
+
+        record_pages(sum(len(indices) for indices in parts))
+        download_name = f"{secure_filename(os.path.splitext(file.filename)[0]) or 'split'}_split.zip"
+        return stream_pdf_response(stream_split_pdf(reader, parts), download_name, 'application/zip', resources)
+
+    except Exception as e:
+        close_all(resources)
+        logging.error(f"Error splitting PDF: {str(e)}")
+        return jsonify({'error': 'An error occurred while splitting PDF'}), 500
+
+@app.route('/extract-pages', methods=['POST'])
+def extract_pages():
+    """Copy the pages in ``page_range`` into a new PDF."""
+    return select_pdf_pages('extracted_pages.pdf', keep=True)
+
+@app.route('/remove-pages', methods=['POST'])
+def remove_pages():
+    """Copy every page except those in ``page_range`` into a new PDF."""
+    return select_pdf_pages('modified.pdf', keep=False)
+
+def select_pdf_pages(download_name, keep):
+    resources = []
+    try:
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file uploaded'}), 400
+        
+        file = request.files['file']
+        if not file or not file.filename.lower().endswith('.pdf'):
+            return jsonify({'error': 'Invalid file format. Please upload a PDF file.'}), 400
+
+        with span('parse'):
+            reader = open_pdf_upload(file, resources)
+            page_count = len(reader.pages)
+        try:
+            indices = select_pages(request.form.get('page_range', ''), page_count)
+            if not keep:
+                removed = set(indices)
+                indices = [index for index in range(page_count) if index not in removed]
+                if not indices:
+                    raise ValueError('At least one page must remain')
+        except ValueError as e:
+            close_all(resources)
+            return jsonify({'error': f'Invalid page range: {str(e)}'}), 400
+
+        record_pages(len(indices))
+        return stream_pdf_response(stream_pdf([(reader, indices)]), download_name, 'application/pdf', resources)
+
+    except Exception as e:
+        close_all(resources)
+        logging.error(f"Error selecting PDF pages: {str(e)}")
+        return jsonify({'error': 'An error occurred while processing PDF'}), 500
+
+def select_pages(page_range, page_count):
+    """Return the 0-based indices of a page range, checking it fits the document."""
+    page_numbers = parse_page_range(page_range)
+    if not page_numbers:
+        raise ValueError('No pages selected')
+    if page_numbers[0] < 1 or page_numbers[-1] > page_count:
+        raise ValueError(f'Pages must be between 1 and {page_count}')
+    return [page_number - 1 for page_number in page_numbers]
+
+def open_pdf_upload(file, resources):
+    """Read an uploaded PDF lazily, adding what must be closed to ``resources``."""
+    upload = Upload(file, UPLOAD_MEMORY_LIMIT, suffix='.pdf')
+    resources.append(upload)
+    handle = upload.open()
+    resources.append(handle)
+    return PyPDF2.PdfReader(handle)
+
+def close_all(resources):
+    for resource in resources:
+        try:
+            resource.close()
+        except OSError:
+            pass
+
+def stream_pdf(sources):
+    """Yield a PDF of the pages in ``(reader, indices)`` pairs, page by page."""
+    buffer = ZipStreamBuffer()
+    writer = PdfPageWriter(buffer)
+    for reader, indices in sources:
+        for _ in timed('copy', writer.add_pages(reader, indices)):
+            yield buffer.drain()
+    writer.close()
+    yield buffer.drain()
+
+def stream_split_pdf(reader, parts):
+    """Yield a ZIP archive holding one PDF per list of page indices."""
+    buffer = ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as zip_file:
+        for part_number, indices in enumerate(parts, start=1):
+            with zip_file.open(f'split_{part_number}.pdf', 'w') as entry:
+                writer = PdfPageWriter(entry)
+                for _ in timed('copy', writer.add_pages(reader, indices)):
+                    yield buffer.drain()
+                writer.close()
+            yield buffer.drain()
+    yield buffer.drain()
+
+def stream_pdf_response(chunks, download_name, mimetype, resources):
+    """Send generated chunks as a download, closing ``resources`` afterwards."""
+    def generate():
+        try:
+            yield from chunks
+        except Exception as e:
+            logger.error(f'Error streaming {download_name}: {str(e)}')
+            raise
+
+    response = Response(generate(), mimetype=mimetype)
+    response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+    # Runs even if the client goes away before the body is started
+    call_on_close(response, lambda: close_all(resources))
+    return response
+
 if __name__ == '__main__':
     try:
         port = 8080
@@ -0,0 +1,59 @@
+"""Benchmark authenticated API requests per second.
+
+Runs GET /api/user/profile through the Flask test client against a
+throwaway user database, so the numbers cover token_required, the user
+lookup and JSON serialisation.
+
+Usage: python benchmarks/auth_requests.py [requests] [threads]
+"""
+import os
+import sys
+import time
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Importing app creates a user database in DATA_DIR
+        os.environ['DATA_DIR'] = temp_dir
+        import app as application
+
+        client = application.app.test_client()
+        client.post('/api/register', json={
+            'first_name': 'Bench',
+            'last_name': 'User',
+            'email': 'bench@example.com',
+            'password': 'bench-password'
+        })
+        token = client.post('/api/login', json={
+            'email': 'bench@example.com',
+            'password': 'bench-password'
+        }).get_json()['token']
+        headers = {'Authorization': f'Bearer {token}'}
+
+        def worker(count):
+            thread_client = application.app.test_client()
+            for _ in range(count):
+                response = thread_client.get('/api/user/profile', headers=headers)
+                assert response.status_code == 200
+
+        workers = [threading.Thread(target=worker, args=(total // threads,)) for _ in range(threads)]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        done = (total // threads) * threads
+        print(f'{done} authenticated requests on {threads} threads in {elapsed:.2f}s: {done / elapsed:.0f} req/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""Generate the deterministic input corpus used by benchmarks/endpoints.py.
+
+Every file is built from a fixed seed, so a corpus generated on one
+machine matches one generated on another byte for byte, and results from
+different commits are measured on the same inputs. Office files are
+re-zipped with fixed timestamps and document dates for the same reason.
+``scale`` multiplies page, paragraph, slide and row counts, for quicker
+runs while working on a change.
+
+Usage: python benchmarks/corpus.py [directory] [scale]
+"""
+import os
+import io
+import sys
+import json
+import re
+import random
+import hashlib
+import zipfile
+import tempfile
+
+# Bump when a generator changes, so existing corpora are rebuilt
+CORPUS_VERSION = 1
+SEED = 20240501
+
+# Office files record when they were created and saved
+DOCUMENT_DATES = re.compile(rb'(<dcterms:(created|modified)\b[^>]*>)[^<]*(</dcterms:\2>)')
+FIXED_DATE = b'2024-01-01T00:00:00Z'
+
+WORDS = (
+    'the quick brown fox jumps over lazy dog invoice quarterly report summary '
+    'revenue growth margin forecast customer region product service support '
+    'delivery schedule contract review budget total amount account balance'
+).split()
+
+# name -> (generator, arguments scaled by ``scale``, fixed arguments)
+CORPUS = {
+    'pdf_10_pages.pdf': ('pdf', {'pages': 10}, {}),
+    'pdf_200_pages.pdf': ('pdf', {'pages': 200}, {}),
+    'jpeg_small.jpg': ('jpeg', {}, {'width': 800, 'height': 600}),
+    'jpeg_large.jpg': ('jpeg', {}, {'width': 4000, 'height': 3000}),
+    'docx_2000_paragraphs.docx': ('docx', {'paragraphs': 2000}, {}),
+    'pptx_200_slides.pptx': ('pptx', {'slides': 200}, {}),
+    'xlsx_100k_rows.xlsx': ('xlsx', {'rows': 100000}, {'columns': 8}),
+    'html_page.html': ('html', {'sections': 200}, {}),
+}
+
+
+def words(rng, count):
+    return ' '.join(rng.choice(WORDS) for _ in range(count))
+
+
+def make_pdf(path, rng, pages):
+    """Write a PDF with text, vector graphics and an image every tenth page."""
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.utils import ImageReader
+
+    image = ImageReader(io.BytesIO(jpeg_bytes(rng, 400, 300)))
+    c = canvas.Canvas(path, invariant=1)
+    for page in range(pages):
+        c.setFont('Helvetica-Bold', 16)
+        c.drawString(60, 790, f'Page {page + 1}')
+        c.setFont('Helvetica', 10)
+        for line in range(50):
+            c.drawString(60, 770 - line * 14, words(rng, 14))
+        for _ in range(5):
+            c.rect(rng.uniform(50, 450), rng.uniform(50, 650), rng.uniform(20, 100), rng.uniform(20, 100))
+        if page % 10 == 0:
+            c.drawImage(image, 300, 60, width=240, height=180)
+        c.showPage()
+    c.save()
+
+
+def jpeg_bytes(rng, width, height, quality=90):
+    """Return a photo-like JPEG: shapes with noise blended over them."""
+    from PIL import Image, ImageDraw
+
+    base = Image.new('RGB', (width, height), (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    draw = ImageDraw.Draw(base)
+    for _ in range(60):
+        x, y = rng.randrange(width), rng.randrange(height)
+        size = rng.randrange(max(1, min(width, height) // 3))
+        color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        draw.ellipse((x - size, y - size, x + size, y + size), fill=color)
+    noise = Image.frombytes('L', (width, height), rng.randbytes(width * height)).convert('RGB')
+    out = io.BytesIO()
+    Image.blend(base, noise, 0.15).save(out, 'JPEG', quality=quality)
+    return out.getvalue()
+
+
+def make_jpeg(path, rng, width, height):
+    with open(path, 'wb') as out:
+        out.write(jpeg_bytes(rng, width, height))
+
+
+def make_docx(path, rng, paragraphs):
+    import docx
+
+    document = docx.Document()
+    for index in range(paragraphs):
+        if index % 50 == 0:
+            document.add_heading(f'Section {index // 50 + 1}', level=1)
+        document.add_paragraph(words(rng, rng.randrange(20, 120)))
+    document.save(path)
+    normalize_zip(path)
+
+
+def make_pptx(path, rng, slides):
+    import pptx
+
+    presentation = pptx.Presentation()
+    layout = presentation.slide_layouts[1]  # title and content
+    for index in range(slides):
+        slide = presentation.slides.add_slide(layout)
+        slide.shapes.title.text = f'Slide {index + 1}: {words(rng, 4)}'
+        body = slide.placeholders[1].text_frame
+        body.text = words(rng, 12)
+        for _ in range(4):
+            body.add_paragraph().text = words(rng, 12)
+    presentation.save(path)
+    normalize_zip(path)
+
+
+def make_xlsx(path, rng, rows, columns):
+    import openpyxl
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Data')
+    sheet.append([f'Column {index + 1}' for index in range(columns)])
+    for row in range(rows):
+        sheet.append([row + 1, words(rng, 2)] + [round(rng.uniform(0, 10000), 2) for _ in range(columns - 2)])
+    workbook.save(path)
+    normalize_zip(path)
+
+
+def make_html(path, rng, sections):
+    parts = ['<!DOCTYPE html><html><head><meta charset="utf-8"><title>Benchmark page</title>',
+             '<style>body { font-family: sans-serif; } table { border-collapse: collapse; } '
+             'td { border: 1px solid #999; padding: 2px 6px; }</style></head><body>']
+    for index in range(sections):
+        parts.append(f'<h2>Section {index + 1}</h2><p>{words(rng, 80)}</p>')
+        if index % 10 == 0:
+            rows = ''.join(f'<tr><td>{words(rng, 2)}</td><td>{rng.randrange(10000)}</td></tr>' for _ in range(10))
+            parts.append(f'<table>{rows}</table>')
+    parts.append('</body></html>')
+    with open(path, 'w', encoding='utf-8') as out:
+        out.write('\n'.join(parts))
+
+
+GENERATORS = {
+    'pdf': make_pdf,
+    'jpeg': make_jpeg,
+    'docx': make_docx,
+    'pptx': make_pptx,
+    'xlsx': make_xlsx,
+    'html': make_html,
+}
+
+
+def normalize_zip(path):
+    """Rewrite an Office file with fixed timestamps and document dates, in place."""
+    with zipfile.ZipFile(path) as source:
+        entries = [(info, source.read(info)) for info in source.infolist()]
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as target:
+        for info, data in entries:
+            if info.filename == 'docProps/core.xml':
+                data = DOCUMENT_DATES.sub(rb'\g<1>' + FIXED_DATE + rb'\g<3>', data)
+            fixed = zipfile.ZipInfo(info.filename, date_time=(1980, 1, 1, 0, 0, 0))
+            fixed.external_attr = info.external_attr
+            target.writestr(fixed, data, compress_type=zipfile.ZIP_DEFLATED)
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def default_directory(scale):
+    return os.path.join(tempfile.gettempdir(), 'pdf-benchmark-corpus', f'v{CORPUS_VERSION}-scale-{scale:g}')
+
+
+def build_corpus(directory=None, scale=1.0):
+    """Generate any missing corpus files and return ``{name: path}``.
+
+    A ``manifest.json`` in the directory records each file's SHA-256, so
+    runs can tell whether they measured the same inputs.
+    """
+    directory = directory or default_directory(scale)
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for name, (kind, scaled, fixed) in CORPUS.items():
+        path = os.path.join(directory, name)
+        paths[name] = path
+        if os.path.exists(path):
+            continue
+        # Each file has its own generator, so adding one does not change the others
+        rng = random.Random(f'{SEED}:{name}')
+        arguments = {key: max(1, round(value * scale)) for key, value in scaled.items()}
+        temp_path = path + '.tmp'
+        GENERATORS[kind](temp_path, rng, **arguments, **fixed)
+        os.replace(temp_path, path)
+
+    manifest = {name: file_digest(path) for name, path in paths.items()}
+    with open(os.path.join(directory, 'manifest.json'), 'w') as out:
+        json.dump(manifest, out, indent=2, sort_keys=True)
+    return paths
+
+
+def main():
+    directory = sys.argv[1] if len(sys.argv) > 1 else None
+    scale = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    paths = build_corpus(directory, scale)
+    for name, path in paths.items():
+        print(f'{name:<30} {os.path.getsize(path):>12,} bytes')
+    print(f'Corpus in {os.path.dirname(next(iter(paths.values())))}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,295 @@
+"""Benchmark every conversion route on the generated corpus.
+
+Each case posts corpus files (see benchmarks/corpus.py) to one route
+through the Flask test client, in a fresh interpreter so that peak RSS
+belongs to that case alone. The first request of a case is a warm-up that
+pays for lazy imports and pools and is not timed; the median of the
+following ones is reported. Results hold wall time, peak RSS and output
+size per case, along with the corpus checksums and the regression
+thresholds, and are written as JSON. Comparing two result files flags
+every case that got slower, bigger or started failing by more than the
+thresholds, and exits with status 1 if any did.
+
+The result cache is disabled so that every request converts.
+
+Usage:
+    python benchmarks/endpoints.py run [--scale S] [--repeat N] [--output FILE] [--baseline FILE] [case ...]
+    python benchmarks/endpoints.py compare BASELINE RESULTS
+    python benchmarks/endpoints.py list
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import resource
+import datetime
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from corpus import default_directory
+
+RESULTS_VERSION = 1
+RESULTS_FOLDER = os.path.join(ROOT, 'benchmark-results')
+
+# name -> (route, {upload field: [corpus files]}, form fields)
+CASES = {
+    'jpg-to-pdf-small': ('/convert-jpg-to-pdf', {'files': ['jpeg_small.jpg'] * 20}, {}),
+    'jpg-to-pdf-large': ('/convert-jpg-to-pdf', {'files': ['jpeg_large.jpg'] * 3}, {}),
+    'pdf-to-jpeg': ('/convert-pdf-to-jpeg', {'file': ['pdf_10_pages.pdf']}, {'quality': '150'}),
+    'pdf-to-word': ('/convert-pdf-to-word', {'file': ['pdf_10_pages.pdf']}, {}),
+    'word-to-pdf': ('/convert-word-to-pdf', {'file': ['docx_2000_paragraphs.docx']}, {}),
+    'powerpoint-to-pdf': ('/convert-powerpoint-to-pdf', {'file': ['pptx_200_slides.pptx']}, {}),
+    'excel-to-pdf': ('/convert-excel-to-pdf', {'file': ['xlsx_100k_rows.xlsx']}, {}),
+    'html-to-pdf': ('/convert-html-to-pdf', {'file': ['html_page.html']}, {}),
+    'add-watermark-text': ('/add-watermark', {'file': ['pdf_200_pages.pdf']},
+                           {'watermark_text': 'CONFIDENTIAL', 'font_size': '48', 'opacity': '30'}),
+    'add-watermark-image': ('/add-watermark', {'file': ['pdf_200_pages.pdf'], 'watermark_image': ['jpeg_small.jpg']},
+                            {'watermark_type': 'image'}),
+    'rotate-pdf': ('/rotate-pdf', {'file': ['pdf_200_pages.pdf']}, {'rotation_angle': '90'}),
+    'rotate-pdf-incremental': ('/rotate-pdf', {'file': ['pdf_200_pages.pdf']},
+                               {'rotation_angle': '90', 'rotation_scope': 'specific', 'page_range': '1-5',
+                                'save_mode': 'incremental'}),
+    'add-page-numbers': ('/add-page-numbers', {'file': ['pdf_200_pages.pdf']}, {'number_style': '1'}),
+    'process-pdf': ('/process-pdf', {'file': ['pdf_200_pages.pdf']}, {'operations': json.dumps([
+        {'operation': 'rotate', 'rotation_angle': 90},
+        {'operation': 'watermark', 'watermark_text': 'DRAFT'},
+        {'operation': 'page_numbers'},
+    ])}),
+    'merge-pdf': ('/merge-pdf', {'files': ['pdf_200_pages.pdf', 'pdf_10_pages.pdf', 'pdf_200_pages.pdf']}, {}),
+    'split-pdf': ('/split-pdf', {'file': ['pdf_200_pages.pdf']}, {}),
+    'extract-pages': ('/extract-pages', {'file': ['pdf_200_pages.pdf']}, {'page_range': '1-5'}),
+    'remove-pages': ('/remove-pages', {'file': ['pdf_200_pages.pdf']}, {'page_range': '1-5'}),
+}
+
+# A metric regresses when it grows by more than both its relative and
+# absolute threshold; the absolute one keeps small, noisy values quiet
+THRESHOLDS = {
+    'wall_time': {'relative': 0.10, 'absolute': 0.05},  # seconds
+    'peak_rss': {'relative': 0.10, 'absolute': 10 * 1024 * 1024},  # bytes
+    'output_bytes': {'relative': 0.02, 'absolute': 1024},
+}
+
+
+def max_rss(who):
+    """Return the peak RSS of this process or its reaped children, in bytes."""
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def run_case(name, corpus_dir, repeat):
+    """Run one case in this process and return its measurements."""
+    logging.disable(logging.INFO)  # the routes log every step
+    import app as application
+    application.RESULT_CACHE_MAX_BYTES = 0
+
+    route, files, form = CASES[name]
+    client = application.app.test_client()
+    baseline_rss = max_rss(resource.RUSAGE_SELF)
+
+    wall_times = []
+    for run in range(repeat + 1):
+        data = dict(form)
+        handles = []
+        try:
+            for field, names in files.items():
+                data[field] = []
+                for corpus_name in names:
+                    handle = open(os.path.join(corpus_dir, corpus_name), 'rb')
+                    handles.append(handle)
+                    data[field].append((handle, corpus_name))
+
+            start = time.perf_counter()
+            response = client.post(route, data=data, content_type='multipart/form-data', buffered=False)
+            output_bytes = 0
+            for chunk in response.iter_encoded():
+                output_bytes += len(chunk)
+            response.close()
+            elapsed = time.perf_counter() - start
+        finally:
+            for handle in handles:
+                handle.close()
+        if run:  # the first run is a warm-up
+            wall_times.append(elapsed)
+
+    return {
+        'route': route,
+        'status': response.status_code,
+        'wall_time': statistics.median(wall_times),
+        'wall_times': wall_times,
+        'peak_rss': max_rss(resource.RUSAGE_SELF),
+        'baseline_rss': baseline_rss,
+        'children_peak_rss': max_rss(resource.RUSAGE_CHILDREN),
+        'output_bytes': output_bytes,
+    }
+
+
+def git_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True)
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                               cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip() + ('-dirty' if dirty else '')
+
+
+def run(args):
+    names = args.cases or list(CASES)
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        sys.exit(f'Unknown case(s): {", ".join(unknown)}. See "endpoints.py list".')
+
+    corpus_dir = args.corpus_dir or default_directory(args.scale)
+    print(f'Building corpus in {corpus_dir}')
+    # Also in a child process: Linux carries a parent's peak RSS over into
+    # the processes it starts, so the parent must stay small
+    corpus_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus.py')
+    subprocess.run([sys.executable, corpus_script, corpus_dir, str(args.scale)],
+                   cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+    with open(os.path.join(corpus_dir, 'manifest.json')) as manifest_file:
+        manifest = json.load(manifest_file)
+
+    commit = git_commit()
+    results = {
+        'version': RESULTS_VERSION,
+        'commit': commit,
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'scale': args.scale,
+        'repeat': args.repeat,
+        'corpus': manifest,
+        'thresholds': THRESHOLDS,
+        'cases': {},
+    }
+
+    print(f'{"case":<26} {"status":>6} {"seconds":>9} {"peak MB":>8} {"output bytes":>14}')
+    for name in names:
+        # A fresh interpreter per case, so peak RSS is not carried over
+        child = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '_case', name, corpus_dir, str(args.repeat)],
+            cwd=ROOT, capture_output=True, text=True
+        )
+        if child.returncode != 0:
+            case = {'route': CASES[name][0], 'error': child.stderr.strip().splitlines()[-1:] or ['failed']}
+            print(f'{name:<26} {"error":>6}  {case["error"][0]}')
+        else:
+            case = json.loads(child.stdout.strip().splitlines()[-1])
+            print(f'{name:<26} {case["status"]:>6} {case["wall_time"]:>9.3f} '
+                  f'{case["peak_rss"] / (1024 * 1024):>8.0f} {case["output_bytes"]:>14,}')
+        results['cases'][name] = case
+
+    output = args.output or os.path.join(RESULTS_FOLDER, f'{(commit or "results")[:12]}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as out:
+        json.dump(results, out, indent=2, sort_keys=True)
+    print(f'Results written to {output}')
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            return compare_results(json.load(baseline_file), results)
+    return 0
+
+
+def regressions(baseline, results):
+    """Yield ``(case, metric, old, new)`` for each case that got worse than the thresholds allow."""
+    thresholds = baseline.get('thresholds', THRESHOLDS)
+    for name, old in baseline['cases'].items():
+        new = results['cases'].get(name)
+        if new is None:
+            continue
+        if 'error' in new or new['status'] != old.get('status', new['status']):
+            if 'error' not in old:
+                yield name, 'status', old.get('status'), new.get('status', 'error')
+            continue
+        if 'error' in old:
+            continue
+        for metric, limit in thresholds.items():
+            growth = new[metric] - old[metric]
+            if growth > limit['absolute'] and growth > old[metric] * limit['relative']:
+                yield name, metric, old[metric], new[metric]
+
+
+def compare_results(baseline, results):
+    print(f'Comparing {results.get("commit")} against {baseline.get("commit")}')
+    if baseline.get('corpus') != results.get('corpus'):
+        print('Warning: the runs used different corpora; sizes and times are not comparable')
+    for field in ('scale', 'repeat', 'cpus', 'python'):
+        if baseline.get(field) != results.get(field):
+            print(f'Warning: {field} differs ({baseline.get(field)} vs {results.get(field)})')
+
+    print(f'{"case":<26} {"seconds":>17} {"peak MB":>13} {"output bytes":>23}')
+    for name, new in results['cases'].items():
+        old = baseline['cases'].get(name)
+        if old is None or 'error' in old or 'error' in new:
+            continue
+        print(f'{name:<26} {old["wall_time"]:>7.3f} {_change(old["wall_time"], new["wall_time"]):>9} '
+              f'{old["peak_rss"] / (1024 * 1024):>5.0f} {_change(old["peak_rss"], new["peak_rss"]):>7} '
+              f'{old["output_bytes"]:>13,} {_change(old["output_bytes"], new["output_bytes"]):>9}')
+
+    found = list(regressions(baseline, results))
+    for name, metric, old, new in found:
+        print(f'Regression: {name} {metric} {old} -> {new}')
+    if not found:
+        print('No regressions')
+    return 1 if found else 0
+
+
+def _change(old, new):
+    if not old:
+        return '' if old == new else 'new'
+    return f'{(new - old) / old:+.1%}'
+
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == '_case':
+        # Internal: run one case and print its measurements for the parent
+        _, _, name, corpus_dir, repeat = sys.argv
+        # Importing app creates its databases and upload folder in DATA_DIR
+        with tempfile.TemporaryDirectory() as data_dir:
+            os.environ['DATA_DIR'] = data_dir
+            print(json.dumps(run_case(name, corpus_dir, int(repeat))))
+        return 0
+
+    parser = argparse.ArgumentParser(description='Benchmark every conversion route on a generated corpus.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run the benchmark cases')
+    run_parser.add_argument('cases', nargs='*', help='cases to run (default: all)')
+    run_parser.add_argument('--scale', type=float, default=1.0, help='corpus size multiplier (default: 1)')
+    run_parser.add_argument('--repeat', type=int, default=3, help='timed requests per case (default: 3)')
+    run_parser.add_argument('--corpus-dir', help='where the corpus is kept (default: a temp directory)')
+    run_parser.add_argument('--output', help='results file (default: benchmark-results/<commit>.json)')
+    run_parser.add_argument('--baseline', help='results file to compare against')
+
+    compare_parser = commands.add_parser('compare', help='compare two results files')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('results')
+
+    commands.add_parser('list', help='list the benchmark cases')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        if args.repeat < 1:
+            parser.error('--repeat must be at least 1')
+        return run(args)
+    if args.command == 'compare':
+        with open(args.baseline) as baseline_file, open(args.results) as results_file:
+            return compare_results(json.load(baseline_file), json.load(results_file))
+    for name, (route, files, form) in CASES.items():
+        inputs = ', '.join(sorted({corpus_name for names in files.values() for corpus_name in names}))
+        print(f'{name:<26} {route:<28} {inputs}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
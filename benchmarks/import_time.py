@@ -0,0 +1,97 @@
+"""Report how long importing app takes, per module, and check it against a budget.
+
+Each run imports app in a fresh interpreter with ``-X importtime``. The
+report lists the modules app imports directly by cumulative import time,
+then the time each lazily loaded converter library takes on first use
+(loaded in turn, so a dependency shared with an earlier one counts there).
+Exits with status 1 if the median import time is over the budget, so it
+can gate a change that adds a heavy import to app's startup path.
+
+Usage: python benchmarks/import_time.py [runs] [budget_ms]
+"""
+import os
+import sys
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Flask and its dependencies alone take about 100 ms here
+DEFAULT_BUDGET_MS = 300
+
+TIMED_IMPORT = 'import time; start = time.perf_counter(); import app; print(time.perf_counter() - start)'
+LAZY_REPORT = '''
+import app
+from lazy_import import preload, import_report
+preload()
+for name, seconds in import_report():
+    print(f'{name}\\t{seconds}')
+'''
+
+
+def run_python(args):
+    result = subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.exit(result.stderr)
+    return result
+
+
+def direct_imports(importtime_output, parent='app'):
+    """Return ``(module, cumulative_us)`` for the modules ``parent`` imports itself.
+
+    ``-X importtime`` prints a module after everything it imports, indented
+    two spaces per level of nesting.
+    """
+    rows = []
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:') or '[us]' in line:
+            continue
+        _, cumulative_us, name = line.split('|', 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((depth, name.strip(), int(cumulative_us)))
+
+    parent_index = max(index for index, row in enumerate(rows) if row[1] == parent)
+    parent_depth = rows[parent_index][0]
+    children = []
+    for depth, name, cumulative_us in reversed(rows[:parent_index]):
+        if depth <= parent_depth:
+            break
+        if depth == parent_depth + 1:
+            children.append((name, cumulative_us))
+    return sorted(children, key=lambda child: child[1], reverse=True)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    budget_ms = float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_BUDGET_MS
+
+    # Importing app creates its databases and upload folder in DATA_DIR
+    with tempfile.TemporaryDirectory() as data_dir:
+        os.environ['DATA_DIR'] = data_dir
+        times_ms = [float(run_python(['-c', TIMED_IMPORT]).stdout) * 1000 for _ in range(runs)]
+        median_ms = statistics.median(times_ms)
+
+        importtime = run_python(['-X', 'importtime', '-c', 'import app']).stderr
+        print(f'{"module imported by app":<30} {"ms":>8}')
+        for name, cumulative_us in direct_imports(importtime)[:15]:
+            print(f'{name:<30} {cumulative_us / 1000:>8.1f}')
+
+        print()
+        print(f'{"loaded on first use":<30} {"ms":>8}')
+        for line in run_python(['-c', LAZY_REPORT]).stdout.splitlines():
+            if '\t' not in line:
+                continue  # a library's own output
+            name, seconds = line.split('\t')
+            print(f'{name:<30} {float(seconds) * 1000:>8.1f}')
+
+        print()
+        print(f'import app: median {median_ms:.0f} ms over {runs} runs '
+              f'(min {min(times_ms):.0f}, max {max(times_ms):.0f}), budget {budget_ms:.0f} ms')
+        if median_ms > budget_ms:
+            print('Over budget')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Benchmark PDF to JPEG rendering throughput against worker count.
+
+Usage: python benchmarks/pdf_to_jpeg.py [pages] [dpi] [max_workers]
+"""
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.pdfgen import canvas
+from pdf_render import get_render_pool, render_pdf_pages
+
+
+def make_pdf(path, pages):
+    """Write a PDF with some text and vector graphics on every page."""
+    c = canvas.Canvas(path)
+    for page in range(pages):
+        for i in range(30):
+            c.circle(300, 420, 10 + i * 8)
+            c.drawString(60, 780 - i * 24, f'Page {page + 1} line {i}: the quick brown fox jumps over the lazy dog')
+        c.showPage()
+    c.save()
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    dpi = int(sys.argv[2]) if len(sys.argv) > 2 else 150
+    max_workers = int(sys.argv[3]) if len(sys.argv) > 3 else (os.cpu_count() or 1)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = os.path.join(temp_dir, 'input.pdf')
+        make_pdf(pdf_path, pages)
+
+        # Warm the pool so process start-up is not part of the measurement
+        pool = get_render_pool(max_workers)
+        list(render_pdf_pages(pdf_path, dpi, 1, max_workers, executor=pool, workers=max_workers))
+
+        print(f'{pages} pages at {dpi} DPI, {os.cpu_count()} CPUs')
+        print(f'{"workers":>8} {"seconds":>9} {"pages/s":>9} {"speedup":>8}')
+        baseline = None
+        workers = 1
+        while workers <= max_workers:
+            start = time.perf_counter()
+            for _ in render_pdf_pages(pdf_path, dpi, executor=pool, workers=workers):
+                pass
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f'{workers:>8} {elapsed:>9.2f} {pages / elapsed:>9.1f} {baseline / elapsed:>7.2f}x')
+            workers *= 2
+
+        pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Benchmark PDF to Word conversion speedup against worker count.
+
+Usage: python benchmarks/pdf_to_word.py [pages] [max_workers]
+"""
+import os
+import sys
+import time
+import logging
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.pdfgen import canvas
+from docx_convert import convert_pdf_to_docx
+
+
+def make_pdf(path, pages):
+    """Write a text-heavy PDF with the given number of pages."""
+    c = canvas.Canvas(path)
+    for page in range(pages):
+        y = 780
+        for line in range(40):
+            c.drawString(60, y, f'Page {page + 1} line {line}: the quick brown fox jumps over the lazy dog')
+            y -= 18
+        c.showPage()
+    c.save()
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = os.path.join(temp_dir, 'input.pdf')
+        make_pdf(pdf_path, pages)
+
+        print(f'{pages} pages, {os.cpu_count()} CPUs')
+        print(f'{"workers":>8} {"seconds":>9} {"pages/s":>9} {"speedup":>8}')
+        baseline = None
+        workers = 1
+        while workers <= max_workers:
+            docx_path = os.path.join(temp_dir, f'output-{workers}.docx')
+            start = time.perf_counter()
+            convert_pdf_to_docx(pdf_path, docx_path, workers=workers)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f'{workers:>8} {elapsed:>9.2f} {pages / elapsed:>9.1f} {baseline / elapsed:>7.2f}x')
+            workers *= 2
+
+
+if __name__ == '__main__':
+    main()
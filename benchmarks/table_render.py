@@ -0,0 +1,86 @@
+"""Benchmark batched table drawing against drawing every cell separately.
+
+Usage: python benchmarks/table_render.py [rows] [columns]
+"""
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import LETTER
+from reportlab.lib.units import inch
+from table_render import TableRenderer
+
+ROW_HEIGHT = 20
+
+
+def make_rows(rows, columns):
+    for row_idx in range(rows):
+        yield [f'r{row_idx}c{col_idx}' if (row_idx + col_idx) % 7 else None for col_idx in range(columns)]
+
+
+def draw_per_cell(c, col_widths, rows):
+    """The previous renderer: one rect and one drawString per cell."""
+    height = LETTER[1]
+    y = height - inch
+    for row in rows:
+        if y < inch:
+            c.showPage()
+            y = height - inch
+        x = inch
+        for col_idx, value in enumerate(row):
+            c.rect(x, y, col_widths[col_idx], ROW_HEIGHT)
+            if value is not None:
+                c.drawString(x + 2, y + 5, str(value))
+            x += col_widths[col_idx]
+        y -= ROW_HEIGHT
+    c.showPage()
+
+
+def draw_batched(c, col_widths, rows):
+    height = LETTER[1]
+    y = height - inch
+    table = TableRenderer(c, col_widths, max(col_widths), ROW_HEIGHT)
+    for row in rows:
+        if y < inch:
+            table.flush()
+            c.showPage()
+            y = height - inch
+        table.draw_row(inch, y, row)
+        y -= ROW_HEIGHT
+    table.flush()
+    c.showPage()
+
+
+def run(draw, path, rows, columns, compress):
+    # Wide sheets run off the page, as they do in the converter
+    col_widths = [60] * columns
+    start = time.perf_counter()
+    c = canvas.Canvas(path, pagesize=LETTER, pageCompression=compress)
+    c.setFont('Helvetica', 10)
+    draw(c, col_widths, make_rows(rows, columns))
+    c.save()
+    return time.perf_counter() - start, os.path.getsize(path)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    columns = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    print(f'{rows} rows x {columns} columns')
+    print(f'{"renderer":>10} {"compressed":>11} {"seconds":>9} {"bytes":>12} {"speedup":>8}')
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'table.pdf')
+        for compress in (0, 1):
+            baseline = None
+            for name, draw in (('per-cell', draw_per_cell), ('batched', draw_batched)):
+                elapsed, size = run(draw, path, rows, columns, compress)
+                baseline = baseline or elapsed
+                print(f'{name:>10} {"yes" if compress else "no":>11} {elapsed:>9.2f} {size:>12} {baseline / elapsed:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
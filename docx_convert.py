@@ -0,0 +1,102 @@
+import os
+import logging
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from lazy_import import lazy_module
+from timing import span
+
+pdf2docx = lazy_module('pdf2docx')
+
+logger = logging.getLogger(__name__)
+
+
+def split_pages(num_pages, segments):
+    """Split page indexes into contiguous, evenly sized segments."""
+    size, extra = divmod(num_pages, segments)
+    result = []
+    start = 0
+    for i in range(segments):
+        end = start + size + (1 if i < extra else 0)
+        if end > start:
+            result.append(list(range(start, end)))
+        start = end
+    return result
+
+
+def _parse_segment(args):
+    """Parse one page segment in a worker process and serialize it to JSON."""
+    pdf_path, page_indexes, json_path = args
+    cv = pdf2docx.Converter(pdf_path)
+    try:
+        settings = cv.default_settings
+        cv.load_pages()
+
+        # Only parse this worker's pages; the document analysis still sees all of them
+        for page in cv.pages:
+            page.skip_parsing = True
+        for i in page_indexes:
+            cv.pages[i].skip_parsing = False
+
+        cv.parse_document(**settings).parse_pages(**settings).serialize(json_path)
+    finally:
+        cv.close()
+
+
+def convert_pdf_to_docx(pdf_path, docx_path, workers=1):
+    """Convert a PDF to DOCX, parsing pages on up to ``workers`` processes.
+
+    ``pdf_path`` may also be the PDF's bytes; it is written to a temporary
+    file only if worker processes need to open it.
+
+    With more than one worker the page range is split into contiguous
+    segments that are parsed in a process pool. Each worker serializes its
+    parsed pages to a private JSON file, and the parent restores them all
+    and writes a single DOCX. Unlike pdf2docx's own ``multi_processing``
+    option this keeps the intermediate files out of the working directory
+    and bounds the pool to ``workers``.
+
+    Returns the number of pages converted.
+    """
+    in_memory = isinstance(pdf_path, (bytes, bytearray))
+    cv = pdf2docx.Converter(stream=pdf_path) if in_memory else pdf2docx.Converter(pdf_path)
+    try:
+        num_pages = len(cv.fitz_doc)
+        workers = max(1, min(workers, num_pages))
+        settings = cv.default_settings
+        if workers == 1:
+            # What Converter.convert does, with the two stages timed apart
+            with span('parse'):
+                cv.parse(**settings)
+            with span('write'):
+                cv.make_docx(docx_path, **settings)
+            return num_pages
+
+        logger.info(f'Converting {num_pages} pages to DOCX with {workers} workers')
+        with span('parse'), tempfile.TemporaryDirectory() as temp_dir:
+            if in_memory:
+                # Workers open the document themselves
+                path = os.path.join(temp_dir, 'input.pdf')
+                with open(path, 'wb') as pdf_file:
+                    pdf_file.write(pdf_path)
+                pdf_path = path
+
+            tasks = [
+                (pdf_path, segment, os.path.join(temp_dir, f'pages-{i}.json'))
+                for i, segment in enumerate(split_pages(num_pages, workers))
+            ]
+
+            # Spawn rather than fork: the web server process has threads running
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=len(tasks), mp_context=context) as executor:
+                list(executor.map(_parse_segment, tasks))
+
+            cv.load_pages()
+            for _, _, json_path in tasks:
+                cv.deserialize(json_path)
+
+        with span('write'):
+            cv.make_docx(docx_path, **settings)
+        return num_pages
+    finally:
+        cv.close()
@@ -0,0 +1,189 @@
+import re
+import queue
+import logging
+import threading
+import subprocess
+import time
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Progress bars are redrawn with carriage returns, padded with spaces and,
+# on some builds, moved with terminal escape sequences
+TERMINAL_ESCAPE = re.compile(r'\x1b\[[0-9;]*[A-Za-z]')
+PROGRESS_BAR = re.compile(r'^\[[=> ]*\]')
+
+
+class RendererBusy(Exception):
+    """No renderer became free before the queue timeout."""
+
+
+class _Renderer:
+    """One long-running wkhtmltopdf process fed conversions on stdin.
+
+    With ``--read-args-from-stdin`` wkhtmltopdf reads one command line per
+    conversion and keeps the engine loaded in between. It reports "Done" on
+    stderr when a conversion finishes and exits if one fails. Its progress
+    bars end in carriage returns rather than newlines; text mode splits them
+    into lines of their own, which are cleaned up before being matched.
+    """
+
+    def __init__(self, binary):
+        self.process = subprocess.Popen(
+            [binary, '--log-level', 'info', '--read-args-from-stdin'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1
+        )
+        self.jobs = 0
+        self.lines = queue.Queue()
+        # stderr is read on a thread so a render can wait on it with a timeout
+        self.reader = threading.Thread(target=self._read_stderr, daemon=True)
+        self.reader.start()
+
+    def _read_stderr(self):
+        for line in self.process.stderr:
+            line = TERMINAL_ESCAPE.sub('', line).strip()
+            if line:
+                self.lines.put(line)
+        self.lines.put(None)
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def render(self, args, timeout):
+        """Run one conversion and wait for it to finish."""
+        if any('\n' in arg for arg in args):
+            raise ValueError('Render arguments cannot contain newlines')
+        # wkhtmltopdf splits the line on whitespace outside double quotes
+        line = ' '.join('"' + arg.replace('\\', '\\\\').replace('"', '\\"') + '"' for arg in args)
+        self.process.stdin.write(line + '\n')
+        self.process.stdin.flush()
+        self.jobs += 1
+
+        messages = []
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                message = self.lines.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                raise TimeoutError(f'HTML rendering took longer than {timeout} seconds')
+            if message is None:
+                raise RuntimeError('wkhtmltopdf failed: ' + ' '.join(messages[-5:]))
+            if message == 'Done':
+                return
+            if message.startswith(('Warning', 'Error')):
+                logger.warning(f'wkhtmltopdf: {message}')
+            if not PROGRESS_BAR.match(message):
+                messages.append(message)
+
+    def rss(self):
+        """Return the process's resident memory in bytes, or None if unknown."""
+        try:
+            with open(f'/proc/{self.process.pid}/status') as status:
+                for line in status:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return None
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+class HtmlRenderPool:
+    """A bounded set of warm wkhtmltopdf processes shared by all requests.
+
+    At most ``size`` processes exist at once; a request waits up to
+    ``queue_timeout`` seconds for one to come free and otherwise gets
+    ``RendererBusy``. Processes are started on first use and then reused.
+    A process is replaced after ``max_jobs`` conversions, when its memory
+    exceeds ``max_rss`` bytes, or after any failure or timeout.
+    """
+
+    def __init__(self, binary, size, queue_timeout=30, render_timeout=60, max_jobs=100, max_rss=512 * 1024 * 1024):
+        self.binary = binary
+        self.queue_timeout = queue_timeout
+        self.render_timeout = render_timeout
+        self.max_jobs = max_jobs
+        self.max_rss = max_rss
+        # Each slot holds an idle renderer, or None if one has yet to be started;
+        # last in, first out keeps the most recently used processes warm
+        self.slots = queue.LifoQueue()
+        for _ in range(size):
+            self.slots.put(None)
+
+    def render(self, args):
+        """Convert with wkhtmltopdf ``args``, e.g. ``[*options, source, output_path]``."""
+        try:
+            renderer = self.slots.get(timeout=self.queue_timeout)
+        except queue.Empty:
+            raise RendererBusy(f'No HTML renderer became free within {self.queue_timeout} seconds')
+
+        try:
+            if renderer is None or not renderer.alive():
+                renderer = _Renderer(self.binary)
+            renderer.render(args, self.render_timeout)
+        except Exception:
+            if renderer is not None:
+                renderer.process.kill()
+                renderer.close()
+            renderer = None
+            raise
+        else:
+            if renderer.jobs >= self.max_jobs:
+                self._recycle(renderer, f'after {renderer.jobs} jobs')
+                renderer = None
+            else:
+                rss = renderer.rss()
+                if rss is not None and rss > self.max_rss:
+                    self._recycle(renderer, f'using {rss // (1024 * 1024)} MB')
+                    renderer = None
+        finally:
+            self.slots.put(renderer)
+
+    def _recycle(self, renderer, reason):
+        logger.info(f'Recycling HTML renderer {renderer.process.pid} {reason}')
+        renderer.close()
+
+    def close(self):
+        """Stop every idle renderer."""
+        while True:
+            try:
+                renderer = self.slots.get_nowait()
+            except queue.Empty:
+                return
+            if renderer is not None:
+                renderer.close()
+
+
+def get_html_render_pool(binary, size, **limits):
+    """Return the shared HTML render pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = HtmlRenderPool(binary, size, **limits)
+        return _pool
+
+
+def wkhtmltopdf_args(options):
+    """Turn a pdfkit-style options dict into wkhtmltopdf command line arguments."""
+    args = []
+    for name, value in options.items():
+        args.append('--' + name)
+        if value is not None:
+            args.append(str(value))
+    return args
@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import logging
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """Run conversions in a local worker pool with job state kept in SQLite.
+
+    Uploaded files are copied into a per-job directory so the request can
+    return straight away. ``runner(operation, form, files, job_dir)`` does the
+    actual work and returns ``(result_path, download_name, mimetype)``; any
+    exception it raises marks the job as failed.
+    """
+
+    def __init__(self, db_path, job_dir, runner, workers=2):
+        self.db_path = db_path
+        self.job_dir = job_dir
+        self.runner = runner
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self.lock = threading.Lock()
+
+        if not os.path.exists(job_dir):
+            os.makedirs(job_dir)
+        self.init_db()
+        self.recover()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def init_db(self):
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                operation TEXT NOT NULL,
+                status TEXT NOT NULL,
+                form TEXT NOT NULL,
+                files TEXT NOT NULL,
+                pid INTEGER,
+                error TEXT,
+                result_path TEXT,
+                result_name TEXT,
+                result_mimetype TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def _update(self, job_id, **fields):
+        columns = ', '.join(f'{name} = ?' for name in fields)
+        with self.lock:
+            conn = self._connect()
+            conn.execute(f'UPDATE jobs SET {columns} WHERE id = ?', (*fields.values(), job_id))
+            conn.commit()
+            conn.close()
+
+    def recover(self):
+        """Mark jobs whose worker process has gone away as failed."""
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute("SELECT id, pid FROM jobs WHERE status IN ('queued', 'running')")
+        # A job recorded under our own pid is left over from an earlier process
+        orphaned = [
+            job_id for job_id, pid in c.fetchall()
+            if pid == os.getpid() or not _pid_alive(pid)
+        ]
+        for job_id in orphaned:
+            c.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                ('Worker stopped before the job finished', time.time(), job_id)
+            )
+        conn.commit()
+        conn.close()
+        if orphaned:
+            logger.warning(f'Marked {len(orphaned)} interrupted jobs as failed')
+
+    def submit(self, operation, form, files):
+        """Store the job inputs, queue the job and return its id.
+
+        ``form`` maps field names to lists of values and ``files`` is a list
+        of ``(field, FileStorage)`` pairs.
+        """
+        job_id = uuid.uuid4().hex
+        job_path = os.path.join(self.job_dir, job_id)
+        os.makedirs(job_path)
+
+        stored_files = []
+        for index, (field, file) in enumerate(files):
+            path = os.path.join(job_path, f'input_{index}')
+            file.save(path)
+            stored_files.append((field, file.filename, path))
+
+        with self.lock:
+            conn = self._connect()
+            conn.execute('''
+                INSERT INTO jobs (id, operation, status, form, files, pid, created_at)
+                VALUES (?, ?, 'queued', ?, ?, ?, ?)
+            ''', (job_id, operation, json.dumps(form), json.dumps(stored_files), os.getpid(), time.time()))
+            conn.commit()
+            conn.close()
+
+        self.executor.submit(self._run, job_id, operation, form, stored_files, job_path)
+        logger.info(f'Queued job {job_id} for {operation}')
+        return job_id
+
+    def _run(self, job_id, operation, form, files, job_path):
+        self._update(job_id, status='running', started_at=time.time())
+        try:
+            result_path, result_name, mimetype = self.runner(operation, form, files, job_path)
+        except Exception as e:
+            logger.error(f'Job {job_id} failed: {str(e)}')
+            self._update(job_id, status='failed', error=str(e)[:1000], finished_at=time.time())
+            return
+
+        self._update(
+            job_id,
+            status='done',
+            result_path=result_path,
+            result_name=result_name,
+            result_mimetype=mimetype,
+            finished_at=time.time()
+        )
+        logger.info(f'Job {job_id} finished')
+
+    def get(self, job_id):
+        """Return the job record as a dict, or None if it does not exist."""
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        c = conn.cursor()
+        c.execute('SELECT * FROM jobs WHERE id = ?', (job_id,))
+        row = c.fetchone()
+        conn.close()
+        return dict(row) if row else None
+
+    def delete(self, job_id):
+        """Remove a job record and its files."""
+        with self.lock:
+            conn = self._connect()
+            conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+            conn.commit()
+            conn.close()
+        shutil.rmtree(os.path.join(self.job_dir, job_id), ignore_errors=True)
+
+    def purge(self, max_age):
+        """Delete finished jobs older than ``max_age`` seconds."""
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute(
+            "SELECT id FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+            (time.time() - max_age,)
+        )
+        expired = [row[0] for row in c.fetchall()]
+        conn.close()
+        for job_id in expired:
+            self.delete(job_id)
+        return len(expired)
+
+
+def _pid_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
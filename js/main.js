@@ -131,7 +131,7 @@ document.querySelectorAll('form').forEach(form => {
 });
 
 // Handle file uploads for PDF tools
-function handleFileUpload(inputElement, allowedTypes = ['application/pdf']) {
+function handleFileUpload(inputElement, allowedTypes = ['application/pdf'], maxSize = 10 * 1024 * 1024) {
     const files = inputElement.files;
     const errors = [];
 
@@ -140,8 +140,8 @@ function handleFileUpload(inputElement, allowedTypes = ['application/pdf']) {
         if (!allowedTypes.includes(file.type)) {
             errors.push(`File "${file.name}" is not a supported format.`);
         }
-        if (file.size > 10 * 1024 * 1024) { // 10MB limit
-            errors.push(`File "${file.name}" exceeds the 10MB size limit.`);
+        if (file.size > maxSize) {
+            errors.push(`File "${file.name}" exceeds the ${Math.round(maxSize / (1024 * 1024))}MB size limit.`);
         }
     }
 
@@ -166,6 +166,21 @@ function showSuccess(message, containerId = 'success-container') {
     }
 }
 
+// Send a form to a server-side tool and return the resulting file
+async function postForBlob(url, formData) {
+    const response = await fetch(url, { method: 'POST', body: formData });
+    if (!response.ok) {
+        let message = `Request failed with status ${response.status}`;
+        try {
+            message = (await response.json()).error || message;
+        } catch (e) {
+            // Not a JSON error body
+        }
+        throw new Error(message);
+    }
+    return response.blob();
+}
+
 // Loading indicator
 function toggleLoading(show, loadingText = 'Processing...') {
     const loader = document.getElementById('loading-indicator');
@@ -0,0 +1,83 @@
+import time
+import logging
+import importlib
+
+logger = logging.getLogger(__name__)
+
+# Every module declared with lazy_module, by name
+_registry = {}
+
+
+class LazyModule:
+    """Stand-in for a module that is imported when first used.
+
+    The converters' libraries are declared through ``lazy_module`` instead
+    of being imported at the top of a file, so a process only pays for the
+    libraries its requests need: one that serves login pages never loads
+    PyMuPDF or openpyxl. Attribute reads and writes go to the real module,
+    which is imported on the first one. ``on_load(module)`` runs once
+    after that import, for settings that used to be applied at startup.
+    """
+
+    def __init__(self, name, on_load=None):
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_on_load', on_load)
+        object.__setattr__(self, '_module', None)
+        object.__setattr__(self, 'load_time', None)
+
+    def _load(self):
+        module = self._module
+        if module is None:
+            # The import system serializes concurrent imports of a module, so
+            # a race only repeats the cheap lookup and the on_load hook
+            start = time.perf_counter()
+            module = importlib.import_module(self._name)
+            if self._on_load is not None:
+                self._on_load(module)
+            elapsed = time.perf_counter() - start
+            object.__setattr__(self, 'load_time', elapsed)
+            object.__setattr__(self, '_module', module)
+            logger.info(f'Loaded {self._name} in {elapsed * 1000:.0f} ms')
+        return module
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = 'loaded' if self.loaded else 'not loaded'
+        return f'<lazy module {self._name!r} ({state})>'
+
+
+def lazy_module(name, on_load=None):
+    """Return the lazy stand-in for module ``name``, registering it on first use."""
+    module = _registry.get(name)
+    if module is None:
+        module = _registry.setdefault(name, LazyModule(name, on_load))
+    return module
+
+
+def preload(names=None):
+    """Import registered modules now, or all of them if ``names`` is None.
+
+    Useful where workers are forked from a preloaded parent and should
+    share the libraries instead of each importing them.
+    """
+    for name in (names if names is not None else list(_registry)):
+        lazy_module(name)._load()
+
+
+def import_report():
+    """Return ``(name, seconds)`` for each registered module, slowest first.
+
+    ``seconds`` is the time its first use spent importing it, or None if
+    it has not been used yet.
+    """
+    report = [(name, module.load_time) for name, module in _registry.items()]
+    return sorted(report, key=lambda entry: -1 if entry[1] is None else entry[1], reverse=True)
@@ -0,0 +1,205 @@
+import math
+import bisect
+import threading
+
+# Latency buckets in seconds, from quick page operations to long conversions
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class _Shards:
+    """Per-thread value dicts, merged only when metrics are collected.
+
+    Each thread updates its own dict, so recording a value takes no lock.
+    The lock is only taken when a thread records its first value and when
+    the shards are collected. Shards of threads that have exited are
+    folded into one at those times, so servers that start a thread per
+    request do not pile them up.
+    """
+
+    def __init__(self, merge):
+        self.merge = merge  # merge(total, value) -> new total
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.shards = []  # (thread, dict)
+        self.retired = {}
+
+    def get(self):
+        try:
+            return self.local.shard
+        except AttributeError:
+            shard = self.local.shard = {}
+            with self.lock:
+                self._retire()
+                self.shards.append((threading.current_thread(), shard))
+            return shard
+
+    def _retire(self):
+        live = []
+        for thread, shard in self.shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                self._merge_into(self.retired, shard)
+        self.shards = live
+
+    def collect(self):
+        """Return the merged value of every label set."""
+        with self.lock:
+            self._retire()
+            totals = {}
+            self._merge_into(totals, self.retired)
+            for _, shard in self.shards:
+                self._merge_into(totals, shard)
+        return totals
+
+    def _merge_into(self, totals, shard):
+        # list() copies the items in one step, so a thread writing to its
+        # shard meanwhile cannot break the iteration
+        for labels, value in list(shard.items()):
+            totals[labels] = self.merge(totals.get(labels), value)
+
+
+def _add(total, value):
+    return value if total is None else total + value
+
+
+def _add_lists(total, value):
+    value = list(value)
+    return value if total is None else [a + b for a, b in zip(total, value)]
+
+
+class Counter:
+    """A value that only goes up, such as requests served or bytes sent."""
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.shards = _Shards(_add)
+
+    def inc(self, *label_values, amount=1):
+        shard = self.shards.get()
+        shard[label_values] = shard.get(label_values, 0) + amount
+
+    def samples(self):
+        for label_values, value in sorted(self.shards.collect().items()):
+            yield self.name, dict(zip(self.labels, label_values)), value
+
+
+class Gauge(Counter):
+    """A value that goes up and down, such as conversions in progress."""
+
+    kind = 'gauge'
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+
+class CallbackMetric:
+    """A metric read from ``callback()`` when metrics are collected.
+
+    For values something else already tracks, such as a cache's size or
+    hit count. ``callback`` returns a dict of label value tuples to values.
+    """
+
+    def __init__(self, name, help, labels, callback, kind='gauge'):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.callback = callback
+        self.kind = kind
+
+    def samples(self):
+        for label_values, value in sorted(self.callback().items()):
+            yield self.name, dict(zip(self.labels, label_values)), value
+
+
+class Histogram:
+    """Counts of observations in cumulative buckets, with their sum."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self.shards = _Shards(_add_lists)
+
+    def observe(self, value, *label_values):
+        shard = self.shards.get()
+        counts = shard.get(label_values)
+        if counts is None:
+            # One count per bucket, then +Inf, then the sum
+            counts = shard[label_values] = [0] * (len(self.buckets) + 2)
+        # The first bucket whose bound is not below value; past the last is +Inf
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def samples(self):
+        for label_values, counts in sorted(self.shards.collect().items()):
+            labels = dict(zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield self.name + '_bucket', {**labels, 'le': _format_value(bound)}, cumulative
+            yield self.name + '_sum', labels, counts[-1]
+            yield self.name + '_count', labels, cumulative
+
+
+class MetricsRegistry:
+    """A set of metrics rendered together in the Prometheus text format.
+
+    Values are kept per process: with several worker processes each one
+    reports its own.
+    """
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=()):
+        return self.register(Gauge(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def callback(self, name, help, labels, callback, kind='gauge'):
+        return self.register(CallbackMetric(name, help, labels, callback, kind))
+
+    def expose(self):
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {_escape_help(metric.help)}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                if labels:
+                    label_text = ','.join(f'{key}="{_escape_label(value)}"' for key, value in labels.items())
+                    name = f'{name}{{{label_text}}}'
+                lines.append(f'{name} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape_help(text):
+    return text.replace('\\', '\\\\').replace('\n', '\\n')
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
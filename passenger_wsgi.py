@@ -8,7 +8,9 @@ sys.path.insert(0, VENV_SITE_PACKAGES)
 
 # Set Python interpreter
 INTERP = os.path.join(VENV_PATH, "bin", "python3")
-if sys.executable != INTERP:
+# Compare resolved paths: Passenger may already run the venv's interpreter
+# under another name, and re-executing it would pay the startup twice
+if os.path.realpath(sys.executable) != os.path.realpath(INTERP):
     os.execl(INTERP, INTERP, *sys.argv)
 
 sys.path.append(os.getcwd())
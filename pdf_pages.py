@@ -0,0 +1,235 @@
+import weakref
+import tempfile
+from collections import deque
+from lazy_import import lazy_module
+
+PyPDF2 = lazy_module('PyPDF2')
+generic = lazy_module('PyPDF2.generic')
+
+# Object numbers of the catalog and page tree, written when the document is closed
+CATALOG = 1
+PAGE_TREE = 2
+
+# Page keys that tie a page to its old document
+EXCLUDED_PAGE_KEYS = {'/Parent', '/StructParents'}
+
+
+_tree_keys = weakref.WeakKeyDictionary()
+
+
+def page_tree_keys(reader):
+    """Return the ``(idnum, generation)`` of every page and page tree node.
+
+    The result is kept for as long as ``reader`` is alive, so splitting one
+    document into many parts walks its page tree only once.
+    """
+    keys = _tree_keys.get(reader)
+    if keys is None:
+        keys = set()
+        nodes = [reader.trailer['/Root'].raw_get('/Pages')]
+        while nodes:
+            node = nodes.pop()
+            if isinstance(node, generic.IndirectObject):
+                keys.add((node.idnum, node.generation))
+            kids = node.get_object().get('/Kids')
+            if kids is not None:
+                nodes.extend(kids.get_object())
+        _tree_keys[reader] = keys
+    return keys
+
+
+class _Output:
+    """Forward writes to a file object, counting bytes for the xref table."""
+
+    def __init__(self, out):
+        self.out = out
+        self.position = 0
+
+    def write(self, data):
+        self.out.write(data)
+        self.position += len(data)
+        return len(data)
+
+
+class PdfPageWriter:
+    """Build a PDF by copying whole pages out of other documents.
+
+    Pages are copied as raw objects: content streams, images and fonts keep
+    their original encoding and are never decoded. Each object is written to
+    ``out`` as soon as it is reached, and only object numbers and offsets
+    are remembered, so memory does not grow with the size of the inputs.
+    ``out`` only needs a ``write`` method; it does not have to be seekable.
+    """
+
+    def __init__(self, out):
+        self.out = _Output(out)
+        self.offsets = [None, None, None]  # by object number; 0 is unused
+        self.page_numbers = []
+        self.reader = None
+        self.out.write(b'%PDF-1.7\n%\xe2\xe3\xcf\xd3\n')
+
+    def _use(self, reader):
+        """Start copying from ``reader``, forgetting the previous document."""
+        if reader is self.reader:
+            return
+        self.reader = reader
+        self.numbers = {}  # (idnum, generation) in the source -> object number here
+        self.pending = deque()
+        # References to the page tree, or to pages that are not copied, are dropped
+        # so that a link or annotation cannot pull in the rest of the document
+        self.tree_keys = page_tree_keys(reader)
+
+    def add_pages(self, reader, indices):
+        """Copy the pages of ``reader`` at ``indices`` (0-based), in order.
+
+        This is a generator that yields after each page has been written, so
+        a caller can send the output so far. Links between pages copied in
+        the same call are kept; links to other pages are dropped.
+        """
+        self._use(reader)
+        pages = []
+        for index in indices:
+            page = reader.pages[index]
+            number = self._allocate()
+            reference = page.indirect_reference
+            if reference is not None:
+                self.numbers.setdefault((reference.idnum, reference.generation), number)
+            pages.append((page, number))
+
+        for page, number in pages:
+            copy = generic.DictionaryObject()
+            for key, value in page.items():
+                if key not in EXCLUDED_PAGE_KEYS:
+                    copy[generic.NameObject(key)] = self._copy(value)
+            copy[generic.NameObject('/Parent')] = generic.IndirectObject(PAGE_TREE, 0, None)
+            self._write_object(number, copy)
+            self.page_numbers.append(number)
+            self._write_pending()
+            yield
+
+    def _allocate(self):
+        self.offsets.append(None)
+        return len(self.offsets) - 1
+
+    def _reference(self, reference):
+        key = (reference.idnum, reference.generation)
+        number = self.numbers.get(key)
+        if number is None:
+            if key in self.tree_keys:
+                return generic.NullObject()
+            number = self._allocate()
+            self.numbers[key] = number
+            self.pending.append((reference, number))
+        return generic.IndirectObject(number, 0, None)
+
+    def _copy(self, obj):
+        """Return ``obj`` with its references renumbered for this document."""
+        if isinstance(obj, generic.IndirectObject):
+            return self._reference(obj)
+        if isinstance(obj, generic.StreamObject):
+            copy = obj.__class__()
+            copy._data = obj._data  # still encoded
+        elif isinstance(obj, generic.DictionaryObject):
+            copy = generic.DictionaryObject()
+        elif isinstance(obj, generic.ArrayObject):
+            return generic.ArrayObject(self._copy(value) for value in obj)
+        else:
+            return obj
+        for key, value in obj.items():
+            copy[generic.NameObject(key)] = self._copy(value)
+        return copy
+
+    def _write_pending(self):
+        """Write every object reached from the pages copied so far."""
+        while self.pending:
+            reference, number = self.pending.popleft()
+            obj = reference.get_object()
+            self._write_object(number, self._copy(obj))
+            if isinstance(obj, generic.StreamObject):
+                # Stream data is only needed once; keep the reader's cache small
+                self.reader.resolved_objects.pop((reference.generation, reference.idnum), None)
+
+    def _write_object(self, number, obj):
+        self.offsets[number] = self.out.position
+        self.out.write(b'%d 0 obj\n' % number)
+        obj.write_to_stream(self.out, None)
+        self.out.write(b'\nendobj\n')
+
+    def close(self):
+        """Write the page tree, catalog, cross-reference table and trailer."""
+        kids = b' '.join(b'%d 0 R' % number for number in self.page_numbers)
+        self.offsets[PAGE_TREE] = self.out.position
+        self.out.write(b'%d 0 obj\n<< /Type /Pages /Kids [ %s ] /Count %d >>\nendobj\n'
+                       % (PAGE_TREE, kids, len(self.page_numbers)))
+        self.offsets[CATALOG] = self.out.position
+        self.out.write(b'%d 0 obj\n<< /Type /Catalog /Pages %d 0 R >>\nendobj\n' % (CATALOG, PAGE_TREE))
+
+        xref_position = self.out.position
+        self.out.write(b'xref\n0 %d\n0000000000 65535 f \n' % len(self.offsets))
+        for offset in self.offsets[1:]:
+            self.out.write(b'%010d 00000 n \n' % offset)
+        self.out.write(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+                       % (len(self.offsets), CATALOG, xref_position))
+
+
+class ChunkedCanvas:
+    """A reportlab canvas that keeps at most ``pages_per_chunk`` pages in memory.
+
+    A reportlab ``Canvas`` holds every finished page until ``save``, so
+    its memory grows with the length of the document. This one draws on a
+    new canvas, saved to an anonymous temporary file, every
+    ``pages_per_chunk`` pages. ``save`` then joins the chunks into the file
+    at ``path`` with ``PdfPageWriter``. ``make_canvas(file)`` creates each canvas;
+    every other method goes to the current one. Fonts and other graphics
+    state do not carry over into a new chunk, just as they do not carry
+    over a ``showPage``.
+    """
+
+    def __init__(self, path, make_canvas, pages_per_chunk):
+        self.path = path
+        self.make_canvas = make_canvas
+        self.pages_per_chunk = pages_per_chunk
+        self.chunks = []
+        self.finished_pages = 0  # pages in saved chunks
+        self.canvas = None
+
+    def _current(self):
+        if self.canvas is None:
+            chunk = tempfile.TemporaryFile()
+            self.chunks.append(chunk)
+            self.canvas = self.make_canvas(chunk)
+        return self.canvas
+
+    def __getattr__(self, attr):
+        return getattr(self._current(), attr)
+
+    def getPageNumber(self):
+        if self.canvas is None:
+            return self.finished_pages + 1
+        return self.finished_pages + self.canvas.getPageNumber()
+
+    def showPage(self):
+        canvas = self._current()
+        canvas.showPage()
+        if canvas.getPageNumber() > self.pages_per_chunk:
+            self._save_chunk()
+
+    def _save_chunk(self):
+        self.canvas.save()
+        self.finished_pages += self.canvas.getPageNumber() - 1
+        self.canvas = None
+
+    def save(self):
+        """Finish the last page, if anything is drawn on it, and write the document."""
+        if self.canvas is not None:
+            self._save_chunk()  # a chunk with nothing drawn on it has no pages
+
+        with open(self.path, 'wb') as out:
+            writer = PdfPageWriter(out)
+            while self.chunks:
+                with self.chunks.pop(0) as chunk:
+                    chunk.seek(0)
+                    reader = PyPDF2.PdfReader(chunk)
+                    for _ in writer.add_pages(reader, range(len(reader.pages))):
+                        pass
+            writer.close()
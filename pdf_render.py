@@ -0,0 +1,99 @@
+import os
+import threading
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from lazy_import import lazy_module
+
+fitz = lazy_module('fitz')  # PyMuPDF
+
+# Documents kept open in each render worker, most recently used last
+_documents = OrderedDict()
+_MAX_OPEN_DOCUMENTS = 4
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_render_pool(size):
+    """Return the shared render process pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawn rather than fork: the web server process has threads running
+            context = multiprocessing.get_context('spawn')
+            _pool = ProcessPoolExecutor(max_workers=size, mp_context=context)
+        return _pool
+
+
+def _open_document(pdf_path):
+    """Open a PDF in a render worker, reusing it for later pages."""
+    # Temp paths can be reused, so the modification time is part of the key
+    key = (pdf_path, os.stat(pdf_path).st_mtime_ns)
+    if key in _documents:
+        _documents.move_to_end(key)
+        return _documents[key]
+
+    doc = fitz.open(pdf_path)
+    _documents[key] = doc
+    if len(_documents) > _MAX_OPEN_DOCUMENTS:
+        _, oldest = _documents.popitem(last=False)
+        oldest.close()
+    return doc
+
+
+def render_page(pdf_path, page_number, dpi, jpeg_quality=95):
+    """Render a single 1-based page to JPEG bytes in a render worker."""
+    doc = _open_document(pdf_path)
+    pixmap = doc[page_number - 1].get_pixmap(dpi=dpi)
+    return pixmap.tobytes('jpeg', jpg_quality=jpeg_quality)
+
+
+def open_pdf(pdf):
+    """Open a PDF given as a path or as bytes."""
+    if isinstance(pdf, (bytes, bytearray)):
+        return fitz.open(stream=pdf, filetype='pdf')
+    return fitz.open(pdf)
+
+
+def render_pdf_pages(pdf_path, dpi, start_page=1, end_page=None, jpeg_quality=95, executor=None, workers=1):
+    """Render PDF pages to JPEG bytes, yielding them in page order.
+
+    Yields ``(page_number, jpeg_bytes)`` for each page in the 1-based,
+    inclusive range. Serially, only one page bitmap is alive at any time,
+    and ``pdf_path`` may also be the PDF's bytes. With an ``executor`` and
+    ``workers`` > 1, up to ``workers`` pages are rendered concurrently in
+    the pool, which opens the file by path; results are still yielded in
+    order and at most ``workers`` encoded pages are held at once.
+    """
+    with open_pdf(pdf_path) as doc:
+        page_count = doc.page_count
+        last_page = min(end_page or page_count, page_count)
+        page_numbers = range(max(start_page, 1), last_page + 1)
+
+        if executor is None or workers <= 1:
+            for page_number in page_numbers:
+                pixmap = doc[page_number - 1].get_pixmap(dpi=dpi)
+                image_data = pixmap.tobytes('jpeg', jpg_quality=jpeg_quality)
+                pixmap = None
+                yield page_number, image_data
+            return
+
+    pending = deque()
+    try:
+        for page_number in page_numbers:
+            pending.append((
+                page_number,
+                executor.submit(render_page, pdf_path, page_number, dpi, jpeg_quality)
+            ))
+            if len(pending) >= workers:
+                done_page, future = pending.popleft()
+                yield done_page, future.result()
+
+        while pending:
+            done_page, future = pending.popleft()
+            yield done_page, future.result()
+    finally:
+        # Don't leave work queued if the consumer stopped early
+        for _, future in pending:
+            future.cancel()
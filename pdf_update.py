@@ -0,0 +1,150 @@
+import re
+
+STARTXREF = re.compile(rb'startxref\s+(\d+)')
+
+# Trailer entries carried over into the new section
+TRAILER_KEYS = ('/Root', '/Info')
+
+
+def incremental_update(reader, objects):
+    """Return the bytes to append to ``reader``'s file to replace ``objects``.
+
+    ``objects`` is a list of ``(reference, obj)`` pairs, where ``reference``
+    is the ``IndirectObject`` of an existing object and ``obj`` its new
+    value. The update holds only those objects and a cross-reference
+    section chained to the original one through ``/Prev``, so its cost
+    depends on the number of changed objects and not on the file size.
+    The original bytes followed by the update form the new document.
+    """
+    if reader.is_encrypted:
+        raise ValueError('Encrypted PDFs cannot be updated incrementally')
+    if not objects:
+        return b''
+
+    stream = reader.stream
+    size = stream.seek(0, 2)
+    stream.seek(max(0, size - 1024))
+    tail = stream.read()
+    matches = STARTXREF.findall(tail)
+    if not matches:
+        raise ValueError('startxref not found')
+    previous_xref = int(matches[-1])
+    stream.seek(previous_xref)
+    # Follow the original's format: a file that uses cross-reference
+    # streams may not be readable with a classic table appended to it
+    xref_stream = not stream.read(4).startswith(b'xref')
+
+    out = _Section(size)
+    if not tail.endswith((b'\n', b'\r')):
+        out.write(b'\n')
+
+    offsets = {}
+    for reference, obj in objects:
+        offsets[reference.idnum] = (out.position, reference.generation)
+        out.write(b'%d %d obj\n' % (reference.idnum, reference.generation))
+        obj.write_to_stream(out, None)
+        out.write(b'\nendobj\n')
+
+    object_count = max(_object_count(reader), max(offsets) + 1)
+    trailer = []
+    for key in TRAILER_KEYS:
+        if key in reader.trailer:
+            trailer.append(key.encode() + b' ' + _serialize(reader.trailer.raw_get(key)))
+    if '/ID' in reader.trailer:
+        # Written as hex from the original bytes, which PyPDF2 may have decoded as text
+        ids = [_string_bytes(value) for value in reader.trailer['/ID']]
+        trailer.append(b'/ID [ ' + b' '.join(b'<' + value.hex().encode() + b'>' for value in ids) + b' ]')
+    trailer.append(b'/Prev %d' % previous_xref)
+
+    if xref_stream:
+        _write_xref_stream(out, offsets, object_count, trailer)
+    else:
+        _write_xref_table(out, offsets, object_count, trailer)
+    return out.getvalue()
+
+
+class _Section:
+    """Collect the appended bytes, tracking their offsets in the whole file."""
+
+    def __init__(self, start):
+        self.position = start
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def getvalue(self):
+        return b''.join(self.chunks)
+
+
+def _object_count(reader):
+    """Return the original ``/Size``: one more than the highest object number."""
+    # PyPDF2 drops /Size from the trailer of files with cross-reference streams
+    numbers = [number for section in reader.xref.values() for number in section]
+    numbers.extend(reader.xref_objStm)
+    return max(int(reader.trailer.get('/Size', 0)), max(numbers, default=0) + 1)
+
+
+def _string_bytes(value):
+    if hasattr(value, 'get_original_bytes'):
+        return value.get_original_bytes()
+    return bytes(value)
+
+
+def _serialize(obj):
+    out = _Section(0)
+    obj.write_to_stream(out, None)
+    return out.getvalue()
+
+
+def _subsections(numbers):
+    """Group sorted object numbers into runs of consecutive numbers."""
+    runs = []
+    for number in numbers:
+        if runs and runs[-1][0] + len(runs[-1][1]) == number:
+            runs[-1][1].append(number)
+        else:
+            runs.append((number, [number]))
+    return runs
+
+
+def _write_xref_table(out, offsets, object_count, trailer):
+    xref_position = out.position
+    # Object 0 heads the free list; without it some readers take the
+    # section's first object number as an offset to correct for
+    out.write(b'xref\n0 1\n0000000000 65535 f \n')
+    for first, numbers in _subsections(sorted(offsets)):
+        out.write(b'%d %d\n' % (first, len(numbers)))
+        for number in numbers:
+            offset, generation = offsets[number]
+            out.write(b'%010d %05d n \n' % (offset, generation))
+    out.write(b'trailer\n<< /Size %d ' % object_count + b' '.join(trailer) + b' >>\n')
+    out.write(b'startxref\n%d\n%%%%EOF\n' % xref_position)
+
+
+def _write_xref_stream(out, offsets, object_count, trailer):
+    # The cross-reference stream is an object too, numbered after the last one
+    number = object_count
+    xref_position = out.position
+    offsets = dict(offsets)
+    offsets[number] = (xref_position, 0)
+
+    offset_width = max(4, (xref_position.bit_length() + 7) // 8)
+    index = []
+    rows = []
+    for first, numbers in _subsections(sorted(offsets)):
+        index.append(b'%d %d' % (first, len(numbers)))
+        for entry in numbers:
+            offset, generation = offsets[entry]
+            rows.append(b'\x01' + offset.to_bytes(offset_width, 'big') + generation.to_bytes(2, 'big'))
+    data = b''.join(rows)
+
+    out.write(b'%d 0 obj\n<< /Type /XRef /Size %d /W [ 1 %d 2 ] /Index [ %s ] /Length %d '
+              % (number, number + 1, offset_width, b' '.join(index), len(data)))
+    out.write(b' '.join(trailer) + b' >>\nstream\n')
+    out.write(data)
+    out.write(b'\nendstream\nendobj\n')
+    out.write(b'startxref\n%d\n%%%%EOF\n' % xref_position)
+
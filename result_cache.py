@@ -0,0 +1,165 @@
+import os
+import json
+import logging
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """Size-capped, least-recently-used cache of conversion outputs on disk.
+
+    Each entry is a ``<key>.bin`` file holding the response body and a
+    ``<key>.json`` file with its metadata (mimetype and headers). An entry's
+    modification time is its last use, so the LRU order survives restarts
+    and is shared by every process that uses the same directory.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        self.total_bytes = sum(size for _, size, _ in self._entries())
+
+    def _path(self, key, suffix):
+        return os.path.join(self.directory, key + suffix)
+
+    def _entries(self):
+        """Return ``(key, size, last_used)`` for every complete entry on disk."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.bin'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((name[:-4], stat.st_size, stat.st_mtime))
+        return entries
+
+    def get(self, key):
+        """Return ``(path, meta)`` for a cached result, or None on a miss."""
+        path = self._path(key, '.bin')
+        try:
+            with open(self._path(key, '.json')) as meta_file:
+                meta = json.load(meta_file)
+            os.utime(path)  # mark as most recently used
+        except (OSError, ValueError):
+            with self.lock:
+                self.misses += 1
+            return None
+
+        with self.lock:
+            self.hits += 1
+        return path, meta
+
+    def tee(self, key, chunks, meta):
+        """Wrap a response body so it is stored in the cache as it is sent."""
+        return _CacheWriter(self, key, chunks, meta)
+
+    def put(self, key, data, meta):
+        """Store a result that is already complete in memory."""
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                out.write(data)
+            self._commit(key, temp_path, meta)
+        except OSError as e:
+            logger.error(f'Error storing cached result: {str(e)}')
+
+    def _commit(self, key, temp_path, meta):
+        size = os.path.getsize(temp_path)
+        if size > self.max_bytes:
+            os.unlink(temp_path)
+            return
+
+        with open(self._path(key, '.json'), 'w') as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(temp_path, self._path(key, '.bin'))
+
+        with self.lock:
+            self.total_bytes += size
+            over_limit = self.total_bytes > self.max_bytes
+        if over_limit:
+            self._evict()
+
+    def _evict(self):
+        """Delete least recently used entries until the cache fits its cap."""
+        with self.lock:
+            # Other processes share the directory, so recount from disk
+            entries = sorted(self._entries(), key=lambda entry: entry[2])
+            total = sum(size for _, size, _ in entries)
+            for key, size, _ in entries:
+                if total <= self.max_bytes:
+                    break
+                for suffix in ('.bin', '.json'):
+                    try:
+                        os.unlink(self._path(key, suffix))
+                    except OSError:
+                        pass
+                total -= size
+                self.evictions += 1
+            self.total_bytes = total
+
+    def stats(self):
+        """Return the cache counters and current size."""
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+class _CacheWriter:
+    """Response iterable that copies each chunk to a cache entry.
+
+    The entry is only committed once the whole body has been sent; a client
+    that disconnects early leaves nothing behind. ``close`` is forwarded to
+    the wrapped iterable so file handles and temp files are still released.
+    """
+
+    def __init__(self, cache, key, chunks, meta):
+        self.cache = cache
+        self.key = key
+        self.meta = meta
+        self.chunks = chunks
+        self.iterator = iter(chunks)
+        fd, self.temp_path = tempfile.mkstemp(dir=cache.directory, suffix='.tmp')
+        self.out = os.fdopen(fd, 'wb')
+        self.complete = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            chunk = next(self.iterator)
+        except StopIteration:
+            self.complete = True
+            raise
+        self.out.write(chunk)
+        return chunk
+
+    def close(self):
+        if hasattr(self.chunks, 'close'):
+            self.chunks.close()
+        if self.out.closed:
+            return
+        self.out.close()
+        try:
+            if self.complete:
+                self.cache._commit(self.key, self.temp_path, self.meta)
+            else:
+                os.unlink(self.temp_path)
+        except OSError as e:
+            logger.error(f'Error storing cached result: {str(e)}')
@@ -0,0 +1,13 @@
+import os
+import shutil
+import tempfile
+
+# Importing app creates its databases and upload folder in DATA_DIR; keep
+# them out of the working tree. Set before any test module imports app, and
+# inherited by the interpreters tests start.
+DATA_DIR = tempfile.mkdtemp(prefix='pdf-tests-')
+os.environ['DATA_DIR'] = DATA_DIR
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+import shutil
+
+import pytest
+
+from html_render import HtmlRenderPool
+
+WKHTMLTOPDF = os.environ.get('WKHTMLTOPDF_PATH') or shutil.which('wkhtmltopdf')
+
+# What wkhtmltopdf 0.12.6 writes to stderr for one conversion with
+# --log-level info: progress bars redrawn with carriage returns, and stage
+# names padded with spaces to overwrite them
+PROGRESS = (
+    'Loading pages (1/6)\n'
+    '[>                                                           ] 0%\r'
+    '[==============================>                             ] 50%\r'
+    '[============================================================] 100%\r'
+    'Counting pages (2/6)                                                    \n'
+    '[============================================================] Object 1 of 1\r'
+    'Resolving links (4/6)                                                   \n'
+    '[============================================================] Object 1 of 1\r'
+    'Loading headers and footers (5/6)                                       \n'
+    'Printing pages (6/6)\n'
+    '[>                                                           ] Preparing\r'
+    '[============================================================] Page 1 of 1\r'
+    'Done                                                                    \n'
+)
+
+STAND_IN = f'''#!{sys.executable}
+import sys, shlex
+for line in sys.stdin:
+    with open(shlex.split(line)[-1], 'wb') as out:
+        out.write(b'%PDF-1.4\\n%%EOF\\n')
+    sys.stderr.write({PROGRESS!r})
+    sys.stderr.flush()
+'''
+
+
+def render_twice(binary, tmp_path):
+    """Render two pages on a one-process pool; return the outputs and the process ids."""
+    source = tmp_path / 'page.html'
+    source.write_text('<html><body><h1>Hello</h1></body></html>')
+    pool = HtmlRenderPool(binary, 1, render_timeout=20)
+    outputs, pids = [], []
+    try:
+        for index in range(2):
+            output = tmp_path / f'output-{index}.pdf'
+            start = time.monotonic()
+            pool.render(['--encoding', 'utf-8',str(source), str(output)])
+            # Finishing on "Done", not on the render timeout
+            assert time.monotonic() - start < 10
+            renderer = pool.slots.get_nowait()
+            pids.append(renderer.process.pid)
+            pool.slots.put(renderer)
+            outputs.append(output.read_bytes())
+    finally:
+        pool.close()
+    return outputs, pids
+
+
+def test_progress_output_ends_render(tmp_path):
+    binary = tmp_path / 'wkhtmltopdf'
+    binary.write_text(STAND_IN)
+    binary.chmod(0o755)
+
+    outputs, pids = render_twice(str(binary), tmp_path)
+
+    assert all(output.startswith(b'%PDF') for output in outputs)
+    assert pids[0] == pids[1]
+
+
+@pytest.mark.skipif(WKHTMLTOPDF is None, reason='wkhtmltopdf is not installed')
+def test_real_wkhtmltopdf_reuses_process(tmp_path):
+    outputs, pids = render_twice(WKHTMLTOPDF, tmp_path)
+
+    assert all(output.startswith(b'%PDF') for output in outputs)
+    assert pids[0] == pids[1]
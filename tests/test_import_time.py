@@ -0,0 +1,40 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Well above the 300 ms benchmarks/import_time.py checks against, so a busy
+# machine does not fail the test; that script is where regressions show
+BUDGET_MS = 2000
+
+# Converter libraries app must only import on first use
+LAZY_MODULES = ('pdf2docx', 'fitz', 'docx', 'pptx', 'openpyxl', 'requests', 'PyPDF2', 'PIL', 'reportlab.pdfgen')
+
+
+@pytest.fixture(scope='module')
+def import_times(tmp_path_factory):
+    """Import app in a fresh interpreter and return ``{module: cumulative_us}``."""
+    # Run from a temporary directory; DATA_DIR comes from conftest
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import sys; sys.path.insert(0, {ROOT!r}); import app'],
+        cwd=tmp_path_factory.mktemp('import'), capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '[us]' in line:
+            continue
+        _, cumulative_us, name = line.split('|', 2)
+        times[name.strip()] = int(cumulative_us)
+    return times
+
+
+def test_import_app_within_budget(import_times):
+    assert import_times['app'] / 1000 < BUDGET_MS
+
+
+def test_import_app_leaves_converters_unloaded(import_times):
+    assert [name for name in LAZY_MODULES if name in import_times] == []
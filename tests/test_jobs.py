@@ -0,0 +1,70 @@
+import io
+import os
+import time
+
+import pytest
+from reportlab.pdfgen import canvas
+
+import app as application
+
+# operation -> form fields
+OPERATIONS = {
+    'rotate-pdf': {'rotation_angle': '90'},
+    'add-page-numbers': {'number_style': '1'},
+    'extract-pages': {'page_range': '2-3'},
+}
+
+
+def make_pdf(pages=4):
+    out = io.BytesIO()
+    c = canvas.Canvas(out)
+    for page in range(pages):
+        c.drawString(72, 720, f'Page {page + 1}')
+        c.showPage()
+    c.save()
+    return out.getvalue()
+
+
+def wait_for(client, status_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get(status_url).get_json()
+        if status['status'] in ('done', 'failed'):
+            return status
+        time.sleep(0.05)
+    pytest.fail(f'Job did not finish within {timeout}s')
+
+
+def conversions_in_progress(client):
+    """Return the in-progress gauge for every route, from /metrics."""
+    values = {}
+    for line in client.get('/metrics').get_data(as_text=True).splitlines():
+        if line.startswith('pdf_conversions_in_progress{'):
+            labels, value = line.rsplit(' ', 1)
+            values[labels] = float(value)
+    return values
+
+
+def test_jobs_finish_their_requests():
+    client = application.app.test_client()
+    pdf = make_pdf()
+
+    for operation, form in OPERATIONS.items():
+        data = {'operation': operation, 'file': (io.BytesIO(pdf), 'input.pdf'), **form}
+        response = client.post('/jobs', data=data, content_type='multipart/form-data')
+        assert response.status_code == 202
+        status = wait_for(client, response.get_json()['status_url'])
+        assert status['status'] == 'done', status.get('error')
+
+        result = client.get(status['result_url'])
+        assert result.status_code == 200
+        assert result.data.startswith(b'%PDF')
+        result.close()
+
+    # Every replayed response was closed: its conversion is no longer counted,
+    # and its cache entry was committed or discarded
+    for operation in OPERATIONS:
+        assert conversions_in_progress(client).get(f'pdf_conversions_in_progress{{route="/{operation}"}}') == 0
+    cache_files = os.listdir(application.RESULT_CACHE_FOLDER)
+    assert [name for name in cache_files if name.endswith('.tmp')] == []
+    assert any(name.endswith('.bin') for name in cache_files)
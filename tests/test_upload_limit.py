@@ -0,0 +1,66 @@
+import io
+
+import pytest
+from reportlab.pdfgen import canvas
+
+import app as application
+
+LIMIT = 64 * 1024
+
+# Routes that read the form inside their own error handling
+ROUTES = ('/split-pdf', '/jobs')
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(application, 'MAX_CONTENT_LENGTH', LIMIT)
+    return application.app.test_client()
+
+
+def multipart(content, **fields):
+    """Return a multipart body with ``content`` as the uploaded file, and its content type."""
+    boundary = 'limit-test'
+    body = b''
+    for name, value in fields.items():
+        body += f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+    body += (
+        f'--{boundary}\r\n'
+        'Content-Disposition: form-data; name="file"; filename="input.pdf"\r\n'
+        'Content-Type: application/pdf\r\n\r\n'
+    ).encode() + content + f'\r\n--{boundary}--\r\n'.encode()
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+def post_chunked(client, route, body, content_type):
+    # No Content-Length: the size is only known once the body is read. A server
+    # that decodes chunked bodies marks the stream as terminated
+    return client.post(route, input_stream=io.BytesIO(body), content_type=content_type,
+                       headers={'Transfer-Encoding': 'chunked'},
+                       environ_base={'wsgi.input_terminated': True})
+
+
+@pytest.mark.parametrize('route', ROUTES)
+def test_declared_length_over_limit(client, route):
+    body, content_type = multipart(b'%PDF' + b'0' * 2 * LIMIT)
+    response = client.post(route, data=body, content_type=content_type)
+    assert response.status_code == 413
+
+
+@pytest.mark.parametrize('route', ROUTES)
+def test_chunked_upload_over_limit(client, route):
+    body, content_type = multipart(b'%PDF' + b'0' * 2 * LIMIT)
+    response = post_chunked(client, route, body, content_type)
+    assert response.status_code == 413
+    assert 'File too large' in response.get_json()['error']
+
+
+def test_chunked_upload_within_limit(client):
+    out = io.BytesIO()
+    c = canvas.Canvas(out)
+    c.drawString(72, 720, 'Page 1')
+    c.showPage()
+    c.save()
+    body, content_type = multipart(out.getvalue(), rotation_angle='90')
+    with post_chunked(client, '/rotate-pdf', body, content_type) as response:
+        assert response.status_code == 200
+        assert response.data.startswith(b'%PDF')
@@ -0,0 +1,158 @@
+import os
+import time
+import socket
+import threading
+import collections
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+import requests
+
+from result_cache import ResultCache
+from url_fetch import PageFetcher, ResponseTooLarge
+
+MAX_BYTES = 10000
+
+# path -> (Content-Type, body)
+SITE = {
+    '/page.html': ('text/html; charset=utf-8',
+                   '<html><head><link rel="stylesheet" href="css/site.css"></head>'
+                   '<body><img src="/img/logo.png"><script src="js/app.js"></script>'
+                   '<img src="/img/huge.png"></body></html>'),
+    '/css/site.css': ('text/css', 'body { background: url("../img/bg.png") }'),
+    '/img/logo.png': ('image/png', 'LOGO'),
+    '/img/bg.png': ('image/png', 'BACKGROUND'),
+    '/img/huge.png': ('image/png', 'x' * (MAX_BYTES + 1)),
+    '/js/app.js': ('application/javascript', 'var ready = true;'),
+    '/big.html': ('text/html', 'x' * (MAX_BYTES + 1)),
+}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves ``SITE``; ``/slow`` stalls and ``/unsized`` sends no Content-Length."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.hits[self.path] += 1
+        if self.path == '/slow':
+            time.sleep(2)
+        if self.path == '/unsized':
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.wfile.write(b'x' * (MAX_BYTES + 1))
+            self.close_connection = True
+            return
+        if self.path not in SITE:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        content_type, body = SITE[self.path]
+        body = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.hits = collections.Counter()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def fetcher(tmp_path):
+    with requests.Session() as session:
+        yield PageFetcher(session, ResultCache(str(tmp_path / 'assets'), 1024 * 1024),
+                          timeout=(0.5, 0.5), max_bytes=MAX_BYTES)
+
+
+def base_url(server):
+    return f'http://127.0.0.1:{server.server_port}'
+
+
+def fetch(fetcher, url, tmp_path, name):
+    directory = tmp_path / name
+    directory.mkdir()
+    path = fetcher.fetch(url, str(directory))
+    with open(path, encoding='utf-8') as page_file:
+        return page_file.read(), sorted(os.listdir(directory))
+
+
+def test_fetches_page_and_assets_once(server, fetcher, tmp_path):
+    url = base_url(server)
+    page, files = fetch(fetcher, url + '/page.html', tmp_path, 'first')
+
+    assert server.hits['/page.html'] == 1
+    for path in ('/css/site.css', '/img/logo.png', '/img/bg.png', '/js/app.js'):
+        assert server.hits[path] == 1
+    assert 'file://' in page
+    assert f'<base href="{url}/page.html">' in page
+    assert len(files) == 5  # the page, the stylesheet and three assets
+
+
+def test_second_fetch_takes_assets_from_cache(server, fetcher, tmp_path):
+    url = base_url(server) + '/page.html'
+    fetch(fetcher, url, tmp_path, 'first')
+    server.hits.clear()
+    page, files = fetch(fetcher, url, tmp_path, 'second')
+
+    # The oversized image is never cached, so it is the only asset requested again
+    assert dict(server.hits) == {'/page.html': 1, '/img/huge.png': 1}
+    assert len(files) == 5
+
+
+def test_oversized_asset_keeps_original_url(server, fetcher, tmp_path):
+    page, _ = fetch(fetcher, base_url(server) + '/page.html', tmp_path, 'page')
+
+    assert 'src="/img/huge.png"' in page
+    assert 'src="/img/logo.png"' not in page
+
+
+@pytest.mark.parametrize('path', ['/big.html', '/unsized'])
+def test_oversized_document_is_rejected(server, fetcher, tmp_path, path):
+    with pytest.raises(ResponseTooLarge):
+        fetcher.fetch(base_url(server) + path, str(tmp_path))
+
+
+def test_read_timeout(server, fetcher, tmp_path):
+    start = time.monotonic()
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        fetcher.fetch(base_url(server) + '/slow', str(tmp_path))
+    assert time.monotonic() - start < 1.5
+
+
+def test_connect_timeout(fetcher, tmp_path):
+    # A listener whose accept queue is full drops new connection attempts
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(0)
+    port = listener.getsockname()[1]
+    pending = []
+    try:
+        for _ in range(3):
+            client = socket.socket()
+            client.setblocking(False)
+            client.connect_ex(('127.0.0.1', port))
+            pending.append(client)
+
+        start = time.monotonic()
+        with pytest.raises(requests.exceptions.ConnectTimeout):
+            fetcher.fetch(f'http://127.0.0.1:{port}/', str(tmp_path))
+        assert time.monotonic() - start < 1.5
+    finally:
+        for client in pending:
+            client.close()
+        listener.close()
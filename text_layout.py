@@ -0,0 +1,130 @@
+from functools import lru_cache
+from reportlab.lib.units import inch
+from lazy_import import lazy_module
+
+pdfmetrics = lazy_module('reportlab.pdfbase.pdfmetrics')
+
+
+class _GlyphWidths(dict):
+    """Width of each character for one font and size, measured on first use."""
+
+    def __init__(self, font_name, font_size):
+        super().__init__()
+        self.font_name = font_name
+        self.font_size = font_size
+
+    def __missing__(self, char):
+        width = self[char] = pdfmetrics.stringWidth(char, self.font_name, self.font_size)
+        return width
+
+
+class FontMetrics:
+    """Measure text from memoized per-character widths.
+
+    The standard PDF fonts have no kerning, so a string's width is the sum
+    of its glyph widths and every character only has to be looked up once.
+    """
+
+    def __init__(self, font_name, font_size):
+        self.font_name = font_name
+        self.font_size = font_size
+        self.glyph_widths = _GlyphWidths(font_name, font_size)
+
+    def width(self, text):
+        return sum(map(self.glyph_widths.__getitem__, text))
+
+
+@lru_cache(maxsize=32)
+def get_font_metrics(font_name, font_size):
+    """Return the shared metrics for a font and size."""
+    return FontMetrics(font_name, font_size)
+
+
+def wrap_text(text, metrics, max_width):
+    """Break text into lines no wider than ``max_width``.
+
+    Lines break at spaces and at explicit newlines. A word wider than a
+    whole line is split between characters. An empty string gives a single
+    empty line, so blank paragraphs still take up space.
+    """
+    lines = []
+    space_width = metrics.width(' ')
+    for paragraph in text.split('\n'):
+        line = []
+        line_width = 0
+        for word in paragraph.split(' '):
+            word_width = metrics.width(word)
+
+            if line and line_width + space_width + word_width > max_width:
+                lines.append(' '.join(line))
+                line = []
+                line_width = 0
+
+            if word_width > max_width:
+                # Split an overlong word, keeping the remainder for the next line
+                chunk = ''
+                chunk_width = 0
+                for char in word:
+                    char_width = metrics.glyph_widths[char]
+                    if chunk and chunk_width + char_width > max_width:
+                        lines.append(chunk)
+                        chunk = ''
+                        chunk_width = 0
+                    chunk += char
+                    chunk_width += char_width
+                word, word_width = chunk, chunk_width
+
+            if line:
+                line_width += space_width
+            line.append(word)
+            line_width += word_width
+
+        lines.append(' '.join(line))
+    return lines
+
+
+class TextLayout:
+    """Flow wrapped text down the pages of a reportlab canvas.
+
+    Lines are collected for the current page and drawn through a single
+    text object when the page is finished, rather than one ``drawString``
+    per line. Call ``flush`` before saving the canvas.
+    """
+
+    def __init__(self, canvas, page_size, margin=inch, font_name='Helvetica', font_size=12, leading=14):
+        self.canvas = canvas
+        self.width, self.height = page_size
+        self.margin = margin
+        self.font_name = font_name
+        self.font_size = font_size
+        self.leading = leading
+        self.metrics = get_font_metrics(font_name, font_size)
+        self.max_width = self.width - 2 * margin
+        self.y = self.height - margin
+        self.lines = []  # lines placed on the current page, top to bottom
+
+    def add_text(self, text):
+        """Wrap ``text`` and place its lines, starting new pages as they fill up."""
+        for line in wrap_text(text, self.metrics, self.max_width):
+            if self.y < self.margin:  # Check if we need a new page
+                self.show_page()
+            self.lines.append(line)
+            self.y -= self.leading
+
+    def flush(self):
+        """Draw the lines placed on the current page."""
+        if not self.lines:
+            return
+
+        text = self.canvas.beginText(self.margin, self.height - self.margin)
+        text.setFont(self.font_name, self.font_size, self.leading)
+        for line in self.lines:
+            text.textLine(line)
+        self.canvas.drawText(text)
+        self.lines = []
+
+    def show_page(self):
+        """Finish the current page and start a new one."""
+        self.flush()
+        self.canvas.showPage()
+        self.y = self.height - self.margin
@@ -0,0 +1,91 @@
+import re
+import time
+import contextlib
+import contextvars
+
+# Server-Timing metric names are HTTP tokens
+_UNSAFE_NAME = re.compile(r'[^A-Za-z0-9_.-]')
+_NO_SPAN = contextlib.nullcontext()
+_END = object()
+
+_current = contextvars.ContextVar('timings', default=None)
+
+
+class Timings:
+    """Named spans measured while handling one request.
+
+    A stage that runs more than once, such as drawing each page, adds up
+    under its name. Spans measured in another thread are not recorded,
+    as the current timings are kept in a context variable.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans = {}
+
+    @contextlib.contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0) + seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def server_timing(self):
+        """Return the spans and the time so far as a ``Server-Timing`` header value."""
+        entries = [f'{_UNSAFE_NAME.sub("_", name)};dur={seconds * 1000:.1f}' for name, seconds in self.spans.items()]
+        entries.append(f'total;dur={self.elapsed() * 1000:.1f}')
+        return ', '.join(entries)
+
+    def log_fields(self):
+        """Return the spans and the time so far as ``{name}_ms`` fields."""
+        fields = {f'{name}_ms': round(seconds * 1000, 1) for name, seconds in self.spans.items()}
+        fields['total_ms'] = round(self.elapsed() * 1000, 1)
+        return fields
+
+
+def start_timing():
+    """Start timing a request in the current context and return its timings."""
+    timings = Timings()
+    _current.set(timings)
+    return timings
+
+
+def current_timings():
+    return _current.get()
+
+
+def stop_timing():
+    _current.set(None)
+
+
+def span(name):
+    """Time a block as stage ``name`` of the current request, if one is being timed."""
+    timings = _current.get()
+    return timings.span(name) if timings is not None else _NO_SPAN
+
+
+def timed(name, items):
+    """Yield from ``items``, timing the work of producing each one as stage ``name``.
+
+    For generators that do their work lazily, such as pages rendered while
+    a response streams; the time the consumer spends between items is not
+    counted.
+    """
+    items = iter(items)
+    try:
+        while True:
+            with span(name):
+                item = next(items, _END)
+            if item is _END:
+                return
+            yield item
+    finally:
+        if hasattr(items, 'close'):
+            items.close()
@@ -0,0 +1,72 @@
+import io
+import os
+import shutil
+import tempfile
+
+
+class Upload:
+    """An uploaded file kept in memory when small and spilled to disk otherwise.
+
+    Files up to ``memory_limit`` bytes are read into memory and handed to
+    libraries as buffers, which saves a write and a re-read for typical
+    uploads. Larger files are copied to a temporary file once. ``path``
+    gives a real file for tools that need one, writing it only on demand.
+    Call ``close`` (or use ``with``) to remove any temporary file.
+    """
+
+    def __init__(self, file, memory_limit, suffix=''):
+        self.filename = file.filename
+        self.suffix = suffix
+        self.data = None
+        self._path = None
+
+        stream = file.stream
+        head = stream.read(memory_limit + 1)
+        if len(head) <= memory_limit:
+            self.data = head
+            return
+
+        fd, self._path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, 'wb') as out:
+            out.write(head)
+            del head
+            shutil.copyfileobj(stream, out, 1024 * 1024)
+
+    @property
+    def in_memory(self):
+        return self.data is not None
+
+    def open(self):
+        """Return a seekable binary file object over the upload."""
+        if self.in_memory:
+            return io.BytesIO(self.data)
+        return open(self._path, 'rb')
+
+    def source(self):
+        """Return the bytes if the upload is in memory, otherwise its path.
+
+        PyMuPDF and pdf2docx accept either form.
+        """
+        return self.data if self.in_memory else self._path
+
+    def path(self):
+        """Return the path of a file holding the upload, writing one if needed."""
+        if self._path is None:
+            fd, self._path = tempfile.mkstemp(suffix=self.suffix)
+            with os.fdopen(fd, 'wb') as out:
+                out.write(self.data)
+        return self._path
+
+    def close(self):
+        if self._path is not None:
+            try:
+                os.unlink(self._path)
+            except OSError:
+                pass
+            self._path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,295 @@
+import os
+import re
+import html
+import time
+import hashlib
+import logging
+import mimetypes
+import threading
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+_session = None
+_session_lock = threading.Lock()
+
+# url(...) references in stylesheets, style blocks and style attributes
+CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''', re.IGNORECASE)
+CSS_IMPORT = re.compile(r'''@import\s+(['"])([^'"]+)\1''', re.IGNORECASE)
+# src and href attribute values
+HTML_URL_ATTRIBUTE = re.compile(r'''(\s(?:src|href)\s*=\s*)(["'])(.*?)\2''', re.IGNORECASE | re.DOTALL)
+HEAD_TAG = re.compile(r'<head(\s[^>]*)?>', re.IGNORECASE)
+
+
+class ResponseTooLarge(requests.exceptions.RequestException):
+    """A response body was larger than the configured limit."""
+
+
+def get_session(pool_size):
+    """Return the shared HTTP session, creating it on first use.
+
+    The session keeps up to ``pool_size`` connections per host alive across
+    requests, so repeat fetches from the same origin skip the TCP and TLS
+    handshakes.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+
+class _ResourceParser(HTMLParser):
+    """Collect the sub-resource URLs a page needs in order to render."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.base = None
+        self.urls = []  # (url, is_stylesheet)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name: value for name, value in attrs if value}
+        if tag == 'base' and 'href' in attrs and self.base is None:
+            self.base = attrs['href']
+        elif tag in ('img', 'script', 'input', 'source', 'embed') and 'src' in attrs:
+            self.urls.append((attrs['src'], False))
+        elif tag == 'link' and 'href' in attrs:
+            rel = attrs.get('rel', '').lower().split()
+            if 'stylesheet' in rel:
+                self.urls.append((attrs['href'], True))
+            elif 'icon' in rel:
+                self.urls.append((attrs['href'], False))
+
+    handle_startendtag = handle_starttag
+
+
+class PageFetcher:
+    """Download a web page once, with its sub-resources, for local rendering.
+
+    The page is fetched through ``session`` and written to a directory
+    together with its stylesheets, scripts, images and fonts, with every
+    reference rewritten to the local copy. Sub-resources are kept in
+    ``asset_cache`` (a ``ResultCache``) for ``asset_ttl`` seconds, so assets
+    shared between pages are only downloaded once. Each request is bounded
+    by ``timeout`` (connect, read) and ``max_bytes``.
+    """
+
+    def __init__(self, session, asset_cache, timeout=(5, 20), max_bytes=10 * 1024 * 1024,
+                 max_assets=100, asset_ttl=3600, workers=8):
+        self.session = session
+        self.asset_cache = asset_cache
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_assets = max_assets
+        self.asset_ttl = asset_ttl
+        self.workers = workers
+
+    def _download(self, url):
+        """Fetch a URL, returning ``(response, content, mimetype, cacheable)``."""
+        with self.session.get(url, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            length = response.headers.get('Content-Length')
+            if length and length.isdigit() and int(length) > self.max_bytes:
+                raise ResponseTooLarge(f'{url} is larger than {self.max_bytes} bytes')
+
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(64 * 1024):
+                size += len(chunk)
+                if size > self.max_bytes:
+                    raise ResponseTooLarge(f'{url} is larger than {self.max_bytes} bytes')
+                chunks.append(chunk)
+
+            mimetype = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            cache_control = response.headers.get('Cache-Control', '').lower()
+            cacheable = 'no-store' not in cache_control and 'private' not in cache_control
+            return response, b''.join(chunks), mimetype, cacheable
+
+    def _get_asset(self, url):
+        """Return ``(content, mimetype)`` for a sub-resource, from the cache if fresh."""
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        cached = self.asset_cache.get(key)
+        if cached:
+            path, meta = cached
+            if time.time() - meta['fetched_at'] < self.asset_ttl:
+                try:
+                    with open(path, 'rb') as asset_file:
+                        return asset_file.read(), meta['mimetype']
+                except OSError:
+                    pass  # evicted since the lookup
+
+        _, content, mimetype, cacheable = self._download(url)
+        if cacheable:
+            self.asset_cache.put(key, content, {'url': url, 'mimetype': mimetype, 'fetched_at': time.time()})
+        return content, mimetype
+
+    def fetch(self, url, directory):
+        """Save the page at ``url`` and its assets into ``directory``.
+
+        Returns the path of the local copy of the page. Errors fetching the
+        page itself are raised; assets that cannot be fetched are left
+        pointing at their original URL.
+        """
+        response, content, mimetype, _ = self._download(url)
+        final_url = response.url
+        if mimetype not in ('text/html', 'application/xhtml+xml', ''):
+            # Not a web page; let the renderer open the downloaded file directly
+            path = os.path.join(directory, 'page' + _extension(final_url, mimetype))
+            with open(path, 'wb') as page_file:
+                page_file.write(content)
+            return path
+
+        # The header's charset wins over one declared in the page, as in browsers
+        encoding = _header_encoding(response) or _html_encoding(content) or 'utf-8'
+        text = content.decode(encoding, errors='replace')
+
+        parser = _ResourceParser()
+        parser.feed(text)
+        base_url = urljoin(final_url, parser.base) if parser.base else final_url
+
+        # Tag references first, then url(...) in style blocks and attributes
+        references = [(urljoin(base_url, value), stylesheet) for value, stylesheet in parser.urls]
+        references += [(urljoin(base_url, html.unescape(value)), False) for value in _css_urls(text)]
+        local_paths = self._fetch_assets(references, directory)
+
+        def localize_attribute(match):
+            local = _local_url(urljoin(base_url, html.unescape(match.group(3))), local_paths)
+            if local:
+                return match.group(1) + match.group(2) + html.escape(local) + match.group(2)
+            return match.group(0)
+
+        text = HTML_URL_ATTRIBUTE.sub(localize_attribute, text)
+        text = _localize_css(text, base_url, local_paths)
+
+        if parser.base is None:
+            # Anything not fetched still resolves against the original site
+            base_tag = f'<base href="{html.escape(final_url)}">'
+            head = HEAD_TAG.search(text)
+            if head:
+                text = text[:head.end()] + base_tag + text[head.end():]
+            else:
+                text = base_tag + text
+
+        path = os.path.join(directory, 'page.html')
+        with open(path, 'wb') as page_file:
+            page_file.write(text.encode(encoding, errors='xmlcharrefreplace'))
+        return path
+
+    def _try_get_asset(self, url):
+        try:
+            return self._get_asset(url)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f'Skipping asset {url}: {str(e)}')
+            return None
+
+    def _fetch_assets(self, references, directory):
+        """Fetch sub-resources in parallel and return a map of URL to local file URL."""
+        stylesheet_urls = {}
+        for url, stylesheet in references:
+            url = url.partition('#')[0]
+            if urlsplit(url).scheme in ('http', 'https'):
+                stylesheet_urls[url] = stylesheet_urls.get(url, False) or stylesheet
+        urls = list(stylesheet_urls)[:self.max_assets]
+
+        local_paths = {}
+        stylesheets = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for index, (url, result) in enumerate(zip(urls, executor.map(self._try_get_asset, urls))):
+                if result is None:
+                    continue
+                content, mimetype = result
+                if stylesheet_urls[url] or mimetype == 'text/css':
+                    stylesheets.append((url, content.decode('utf-8', errors='replace')))
+                else:
+                    local_paths[url] = _save(directory, f'asset-{index}', url, mimetype, content)
+
+            # Fonts, images and imports referenced from stylesheets, one level deep
+            nested = []
+            for css_url, css_text in stylesheets:
+                for value in _css_urls(css_text):
+                    url = urljoin(css_url, value).partition('#')[0]
+                    if urlsplit(url).scheme in ('http', 'https') and url not in local_paths and url not in nested:
+                        nested.append(url)
+            nested = nested[:max(0, self.max_assets - len(urls))]
+            results = executor.map(self._try_get_asset, nested)
+            for index, (url, result) in enumerate(zip(nested, results), len(urls)):
+                if result is not None:
+                    content, mimetype = result
+                    local_paths[url] = _save(directory, f'asset-{index}', url, mimetype, content)
+
+        for index, (css_url, css_text) in enumerate(stylesheets):
+            css_text = _localize_css(css_text, css_url, local_paths)
+            local_paths[css_url] = _save(directory, f'style-{index}', css_url, 'text/css', css_text.encode('utf-8'))
+        return local_paths
+
+
+def _save(directory, name, url, mimetype, content):
+    """Write a downloaded asset and return its file URL."""
+    path = os.path.join(directory, name + _extension(url, mimetype))
+    with open(path, 'wb') as asset_file:
+        asset_file.write(content)
+    return 'file://' + path
+
+
+def _local_url(url, local_paths):
+    """Return the local file URL for a fetched URL, keeping any fragment."""
+    url, _, fragment = url.partition('#')
+    local = local_paths.get(url)
+    if local and fragment:
+        local += '#' + fragment
+    return local
+
+
+def _css_urls(text):
+    """Return the URLs referenced by ``url(...)`` and ``@import`` in CSS text."""
+    values = [match.group(2).strip() for match in CSS_URL.finditer(text)]
+    values += [match.group(2).strip() for match in CSS_IMPORT.finditer(text)]
+    return [value for value in values if not value.startswith('data:')]
+
+
+def _localize_css(text, base_url, local_paths):
+    """Point CSS ``url(...)`` and ``@import`` references at local copies."""
+    def replace(match):
+        local = _local_url(urljoin(base_url, html.unescape(match.group(2).strip())), local_paths)
+        if local:
+            return match.group(0).replace(match.group(2), local)
+        return match.group(0)
+    text = CSS_URL.sub(replace, text)
+    return CSS_IMPORT.sub(replace, text)
+
+
+def _header_encoding(response):
+    """Return the charset given in a response's Content-Type header."""
+    content_type = response.headers.get('Content-Type', '')
+    match = re.search(r'charset\s*=\s*["\']?([\w-]+)', content_type, re.IGNORECASE)
+    return _valid_encoding(match.group(1)) if match else None
+
+
+def _html_encoding(content):
+    """Return the charset declared in the first bytes of an HTML document."""
+    match = re.search(rb'''<meta[^>]+charset\s*=\s*["']?([\w-]+)''', content[:4096], re.IGNORECASE)
+    return _valid_encoding(match.group(1).decode('ascii')) if match else None
+
+
+def _valid_encoding(encoding):
+    try:
+        ''.encode(encoding)
+    except LookupError:
+        return None
+    return encoding
+
+
+def _extension(url, mimetype):
+    """Pick a file extension for a download, preferring the one in its URL."""
+    extension = os.path.splitext(urlsplit(url).path)[1]
+    if extension and len(extension) <= 6:
+        return extension
+    return mimetypes.guess_extension(mimetype) or ''